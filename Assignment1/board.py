@@ -55,18 +55,30 @@ class GoBoard(object):
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
         self.board = np.full(self.maxpoint, BORDER, dtype=GO_POINT)
+        # Scratch marker for block flood fills, reused between calls
+        self.marker = np.full(self.maxpoint, False, dtype=bool)
+        self._empty = set()
         self._initialize_empty_points(self.board)
+        # Horizontal, vertical, and the two diagonal directions
+        self.line_strides = (1, self.NS, self.NS - 1, self.NS + 1)
+        # One bitboard per color, indexed by color: an int with bit p set
+        # iff point p holds a stone of that color
+        self.bitboards = [0, 0, 0]
+        self._initialize_zobrist()
+        self._initialize_neighbor_tables()
 
     def copy(self):
-        b = GoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.last_move = self.last_move
-        b.last2_move = self.last2_move
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
-        b.board = np.copy(self.board)
+        """
+        Return an independent copy of the board.
+        Bypasses reset(): scalar attributes and the read-only lookup
+        tables are shared, only the mutable state is duplicated.
+        """
+        b = object.__new__(GoBoard)
+        b.__dict__.update(self.__dict__)
+        b.board = self.board.copy()
+        b.marker = np.full(self.maxpoint, False, dtype=bool)
+        b._empty = set(self._empty)
+        b.bitboards = list(self.bitboards)
         return b
 
     def get_color(self, point):
@@ -78,19 +90,27 @@ class GoBoard(object):
     def is_legal(self, point, color):
         """
         Check whether it is legal for color to play on point
-        This method tries to play the move on a temporary copy of the board.
-        This prevents the board from being modified by the move
+        Under the current rules a move is legal exactly when play_move
+        would accept it, i.e. when the point is empty. Testing that directly
+        avoids playing the move on a temporary copy of the board.
         """
-        board_copy = self.copy()
-        can_play_move = board_copy.play_move(point, color)
-        return can_play_move
+        assert is_black_white(color)
+        return self.board[point] == EMPTY
 
     def get_empty_points(self):
         """
         Return:
-            The empty points on the board
+            The empty points on the board, in increasing order
+        """
+        return np.fromiter(sorted(self._empty), dtype=np.intp,
+                           count=len(self._empty))
+
+    def is_full(self):
+        """
+        Return:
+            Whether there are no empty points left on the board
         """
-        return where1d(self.board == EMPTY)
+        return not self._empty
 
     def row_start(self, row):
         assert row >= 1
@@ -100,6 +120,7 @@ class GoBoard(object):
     def _initialize_empty_points(self, board):
         """
         Fills points on the board with EMPTY
+        and records them in the set of empty points
         Argument
         ---------
         board: numpy array, filled with BORDER
@@ -107,6 +128,35 @@ class GoBoard(object):
         for row in range(1, self.size + 1):
             start = self.row_start(row)
             board[start : start + self.size] = EMPTY
+            self._empty.update(range(start, start + self.size))
+
+    def _initialize_zobrist(self):
+        """
+        Create the Zobrist keys, one row per point and one column
+        per color EMPTY, BLACK, WHITE, and the hash of the empty board.
+        The keys are seeded, so equal positions hash equally across runs.
+        """
+        rng = np.random.default_rng(0x455)
+        self.zobrist = rng.integers(0, 2**63, size=(self.maxpoint, 3),
+                                    dtype=np.uint64)
+        empty_points = where1d(self.board == EMPTY)
+        self.hash = int(np.bitwise_xor.reduce(self.zobrist[empty_points, EMPTY]))
+
+    def _initialize_neighbor_tables(self):
+        """
+        Precompute the four neighbors and the four diagonal neighbors
+        of every point, as rows of two (maxpoint, 4) index arrays.
+        Indices are clipped into the board array, so that the rows of
+        BORDER points at the edges stay valid.
+        """
+        p = np.arange(self.maxpoint)
+        NS = self.NS
+        self.nbrs = np.clip(
+            np.stack([p - 1, p + 1, p - NS, p + NS], axis=1),
+            0, self.maxpoint - 1).astype(np.int32)
+        self.dnbrs = np.clip(
+            np.stack([p - NS - 1, p - NS + 1, p + NS - 1, p + NS + 1], axis=1),
+            0, self.maxpoint - 1).astype(np.int32)
 
     def is_eye(self, point, color):
         """
@@ -116,13 +166,9 @@ class GoBoard(object):
             return False
         # Eye-like shape. Check diagonals to detect false eye
         opp_color = GoBoardUtil.opponent(color)
-        false_count = 0
-        at_edge = 0
-        for d in self._diag_neighbors(point):
-            if self.board[d] == BORDER:
-                at_edge = 1
-            elif self.board[d] == opp_color:
-                false_count += 1
+        dnb_colors = self.board[self.dnbrs[point]]
+        at_edge = int(np.any(dnb_colors == BORDER))
+        false_count = int(np.count_nonzero(dnb_colors == opp_color))
         return false_count <= 1 - at_edge  # 0 at edge, 1 in center
 
     def _is_surrounded(self, point, color):
@@ -130,20 +176,18 @@ class GoBoard(object):
         check whether empty point is surrounded by stones of color
         (or BORDER) neighbors
         """
-        for nb in self._neighbors(point):
-            nb_color = self.board[nb]
-            if nb_color != BORDER and nb_color != color:
-                return False
-        return True
+        nb_colors = self.board[self.nbrs[point]]
+        return not np.any((nb_colors != BORDER) & (nb_colors != color))
 
     def _has_liberty(self, block):
         """
         Check if the given block has any liberty.
         block is a numpy boolean array
         """
+        board = self.board
+        nbrs = self.nbrs
         for stone in where1d(block):
-            empty_nbs = self.neighbors_of_color(stone, EMPTY)
-            if empty_nbs:
+            if EMPTY in board[nbrs[stone]]:
                 return True
         return False
 
@@ -161,19 +205,36 @@ class GoBoard(object):
         """
         Find the connected component of the given point.
         """
-        marker = np.full(self.maxpoint, False, dtype=bool)
-        pointstack = [point]
         color = self.get_color(point)
         assert is_black_white_empty(color)
+        self._flood_fill(point)
+        return self.marker.copy()
+
+    def _flood_fill(self, point):
+        """
+        Mark the connected component of point in self.marker.
+        Liberties are detected during the same pass.
+        Returns boolean: whether the component has an EMPTY neighbor
+        """
+        board = self.board
+        NS = self.NS
+        marker = self.marker
+        marker.fill(False)
+        color = board[point]
         marker[point] = True
+        pointstack = [point]
+        has_liberty = False
         while pointstack:
             p = pointstack.pop()
-            neighbors = self.neighbors_of_color(p, color)
-            for nb in neighbors:
-                if not marker[nb]:
-                    marker[nb] = True
-                    pointstack.append(nb)
-        return marker
+            for nb in (p - 1, p + 1, p - NS, p + NS):
+                nb_color = board[nb]
+                if nb_color == color:
+                    if not marker[nb]:
+                        marker[nb] = True
+                        pointstack.append(nb)
+                elif nb_color == EMPTY:
+                    has_liberty = True
+        return has_liberty
 
     def _detect_and_process_capture(self, nb_point):
         """
@@ -184,10 +245,16 @@ class GoBoard(object):
         This result is used in play_move to check for possible ko
         """
         single_capture = None
-        opp_block = self._block_of(nb_point)
-        if not self._has_liberty(opp_block):
-            captures = list(where1d(opp_block))
+        opp_color = self.get_color(nb_point)
+        assert is_black_white(opp_color)
+        if not self._flood_fill(nb_point):
+            captures = list(where1d(self.marker))
+            for stone in captures:
+                self.bitboards[opp_color] &= ~(1 << int(stone))
+            self.hash ^= int(np.bitwise_xor.reduce(
+                self.zobrist[captures, opp_color] ^ self.zobrist[captures, EMPTY]))
             self.board[captures] = EMPTY
+            self._empty.update(captures)
             if len(captures) == 1:
                 single_capture = nb_point
         return single_capture
@@ -203,31 +270,26 @@ class GoBoard(object):
             return False
 
         self.board[point] = color
+        self.bitboards[color] |= 1 << int(point)
+        self.hash ^= int(self.zobrist[point, EMPTY] ^ self.zobrist[point, color])
+        self._empty.discard(point)
         self.current_player = GoBoardUtil.opponent(color)
         self.last2_move = self.last_move
         self.last_move = point
         return True
 
     def neighbors_of_color(self, point, color):
-        """ List of neighbors of point of given color """
-        nbc = []
-        for nb in self._neighbors(point):
-            if self.get_color(nb) == color:
-                nbc.append(nb)
-        return nbc
+        """ Array of neighbors of point of given color """
+        nbs = self.nbrs[point]
+        return nbs[self.board[nbs] == color]
 
     def _neighbors(self, point):
-        """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        """ Array of all four neighbors of the point """
+        return self.nbrs[point]
 
     def _diag_neighbors(self, point):
-        """ List of all four diagonal neighbors of point """
-        return [
-            point - self.NS - 1,
-            point - self.NS + 1,
-            point + self.NS - 1,
-            point + self.NS + 1,
-        ]
+        """ Array of all four diagonal neighbors of point """
+        return self.dnbrs[point]
 
     def last_board_moves(self):
         """
@@ -244,66 +306,15 @@ class GoBoard(object):
     def check_for_five(self, point, color):
         """
         Check row, column and diagonal for five or more stones connected
+        Uses the bitboard of color: bit p is set iff point p has a stone
+        of color. BORDER bits are never set, so runs cannot wrap around
+        rows. point is the last move; the bitboard covers it.
         """
-
-        # Check Hortizontally
-        left = point - 1
-        right = point + 1
-        count = 1
-        # Left or Right stone of the current point is the same color
-        while (self.board[left] == color or self.board[right] == color):
-            if self.board[left] == color:
-                count += 1
-                left -= 1   # Keep traversing left
-            if self.board[right] == color:
-                count += 1
-                right +=1   # Keep traversing right
-        if count >= 5:      # Five or more stones connected
-            return True     # There is a winner
-
-        # Check Vertically
-        top = point - self.size
-        bottom = point + self.size
-        count = 1
-        # Top or Bottom stone of the current point is the same color
-        while (self.board[top] == color or self.board[bottom] == color):
-            if self.board[top] == color:
-                count += 1
-                top -= self.size    # Keep traversing upwards
-            if self.board[bottom] == color:
-                count += 1
-                bottom += self.size # Keep traversing downwards
-        if count >= 5:
-            return True
-
-        # Check Diagonally (Bottom left to Top right: / )
-        length = self.size - 1
-        topRight = point - length
-        botLeft = point + length
-        count = 1
-        while (self.board[topRight] == color or self.board[botLeft] == color):
-            if self.board[topRight] == color:
-                count += 1
-                topRight -= length   # Keep traversing upwards diagonally
-            if self.board[botLeft] == color:
-                count += 1
-                botLeft += length # Keep traversing downwards diagonally
-        if count >= 5:
-            return True
-
-        # Check Diagonally (Top left to Bottom right: \ )
-        topLeft = point - self.NS
-        botRight = point + self.NS
-        count = 1
-        while (self.board[topLeft] == color or self.board[botRight] == color):
-            if self.board[topLeft] == color:
-                count += 1
-                topLeft -= self.NS
-            if self.board[botRight] == color:
-                count += 1
-                botRight += self.NS
-        if count >= 5:
-            return True
-
-        return False    # Went through all the checks 
-            
+        x = self.bitboards[color]
+        for stride in self.line_strides:
+            # Bit p survives iff p, p + stride, ..., p + 4 * stride all match
+            y = x & (x >> stride)
+            y &= y >> (2 * stride)
+            if y & (x >> (4 * stride)):
+                return True     # There is a winner
+        return False    # Went through all the checks
@@ -25,10 +25,12 @@ def is_black_white_empty(color):
 
 
 """
-A GO_POINT is a point on a Go board.
-It is encoded as a 32-bit integer, using the numpy type.
+A GO_POINT is the content of a point on a Go board.
+All colors fit in 8 bits, so it is encoded as an 8-bit integer,
+using the numpy type. This keeps full-board scans and comparisons
+such as board == EMPTY at one byte per point.
 """
-GO_POINT = np.int32
+GO_POINT = np.int8
 
 """
 Encoding of special pass move
@@ -141,11 +143,19 @@ class GoBoardUtil(object):
             the color to generate the move for.
         """
         moves = board.get_empty_points()
-        np.random.shuffle(moves)
-        for move in moves:
+        num_moves = len(moves)
+        randint = np.random.randint
+        is_eye = board.is_eye
+        is_legal = board.is_legal
+        # Lazy Fisher-Yates shuffle: draw one candidate at a time and stop
+        # at the first legal move, instead of shuffling all moves up front.
+        for i in range(num_moves):
+            j = randint(i, num_moves)
+            moves[i], moves[j] = moves[j], moves[i]
+            move = moves[i]
             legal = not (
-                use_eye_filter and board.is_eye(move, color)
-            ) and board.is_legal(move, color)
+                use_eye_filter and is_eye(move, color)
+            ) and is_legal(move, color)
             if legal:
                 return move
         return PASS
@@ -157,11 +167,13 @@ class GoBoardUtil(object):
         """
         empty_points = board.get_empty_points()
         color = board.current_player
+        is_eye = board.is_eye
+        is_legal = board.is_legal
         moves = []
         for move in empty_points:
             legal = not (
-                use_eye_filter and board.is_eye(move, color)
-            ) and board.is_legal(move, color)
+                use_eye_filter and is_eye(move, color)
+            ) and is_legal(move, color)
             if legal:
                 moves.append(move)
         return moves
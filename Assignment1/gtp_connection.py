@@ -5,6 +5,7 @@ Parts of this code were originally based on the gtp module
 in the Deep-Go project by Isaac Henrion and Amos Storkey 
 at the University of Edinburgh.
 """
+import os
 import traceback
 from sys import stdin, stdout, stderr
 from board_util import (
@@ -20,6 +21,12 @@ from board_util import (
 import numpy as np
 import re
 
+# Leading command ids in regression test files, e.g. "10 genmove b"
+LEADING_DIGITS = re.compile(r"^\d+")
+
+# Display character of each point color, indexed by EMPTY, BLACK, WHITE, BORDER
+BOARD_CHARS = np.array([".", "X", "O", "?"])
+
 
 class GtpConnection:
     def __init__(self, go_engine, board, debug_mode=False):
@@ -35,6 +42,9 @@ class GtpConnection:
 
         self.game_status = "playing"
         self._debug_mode = debug_mode
+        # When stdout is not a terminal, responses are buffered and
+        # flushed once per batch of commands read from stdin
+        self._interactive = stdout.isatty()
         self.go_engine = go_engine
         self.board = board
         self.game_status = "playing"    # Default game status
@@ -72,6 +82,7 @@ class GtpConnection:
             "play": (2, "Usage: play {b,w} MOVE"),
             "legal_moves": (1, "Usage: legal_moves {w,b}"),
         }
+        self._initialize_point_labels()
 
     def write(self, data):
         stdout.write(data)
@@ -83,23 +94,41 @@ class GtpConnection:
         """
         Start a GTP connection. 
         This function continuously monitors standard input for commands.
+        In piped mode, stdin is read in chunks and all complete commands
+        in a chunk are answered before a single flush, which happens just
+        before the next blocking read.
         """
-        line = stdin.readline()
-        while line:
-            self.get_cmd(line)
+        if self._interactive:
             line = stdin.readline()
+            while line:
+                self.get_cmd(line)
+                line = stdin.readline()
+            return
+        fd = stdin.fileno()
+        pending = b""
+        chunk = os.read(fd, 65536)
+        while chunk:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                self.get_cmd(line.decode() + "\n")
+            self.flush()
+            chunk = os.read(fd, 65536)
+        if pending:
+            self.get_cmd(pending.decode())
+            self.flush()
 
     def get_cmd(self, command):
         """
         Parse command string and execute it
         """
-        if len(command.strip(" \r\t")) == 0:
+        if not command.strip(" \r\t"):
             return
         if command[0] == "#":
             return
         # Strip leading numbers from regression tests
         if command[0].isdigit():
-            command = re.sub("^\d+", "", command).lstrip()
+            command = LEADING_DIGITS.sub("", command).lstrip()
 
         elements = command.split()
         if not elements:
@@ -119,7 +148,6 @@ class GtpConnection:
         else:
             self.debug_msg("Unknown command: {}\n".format(command_name))
             self.error("Unknown command")
-            stdout.flush()
 
     def has_arg_error(self, cmd, argnum):
         """
@@ -140,18 +168,33 @@ class GtpConnection:
     def error(self, error_msg):
         """ Send error msg to stdout """
         stdout.write("? {}\n\n".format(error_msg))
-        stdout.flush()
+        if self._interactive:
+            stdout.flush()
 
     def respond(self, response=""):
         """ Send response to stdout """
         stdout.write("= {}\n\n".format(response))
-        stdout.flush()
+        if self._interactive:
+            stdout.flush()
 
     def reset(self, size):
         """
         Reset the board to empty board of given size
         """
         self.board.reset(size)
+        self._initialize_point_labels()
+
+    def _initialize_point_labels(self):
+        """
+        Precompute the lowercase label, such as 'a1', of every point
+        on the board, indexed by point. Non-board points map to None.
+        """
+        size = self.board.size
+        self._point_labels = [None] * self.board.maxpoint
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                point = coord_to_point(row, col, size)
+                self._point_labels[point] = format_point((row, col)).lower()
 
     def board2d(self):
         return str(GoBoardUtil.get_twoD_board(self.board))
@@ -217,21 +260,11 @@ class GtpConnection:
         Otherwise, return a list of all empty points on the board in sorted order. 
         """
 
-        legalMoves = []
         # If game is ongoing:
         if (self.game_status == "playing"):
             emptyPositions = self.board.get_empty_points()
-
-            # Not used, but defining anyway for now
-            player = self.board.current_player
-
-            for i in emptyPositions:
-                legalMoves.append(format_point(
-                    point_to_coord(i, self.board.size)).lower())
-
-            # legalMoves.sort(key=lambda x: x[0])
-
-            self.respond(" ".join(sorted(legalMoves)))
+            labels = self._point_labels
+            self.respond(" ".join(sorted(labels[p] for p in emptyPositions)))
 
         else:
             self.respond()
@@ -245,22 +278,12 @@ class GtpConnection:
     def gogui_rules_board_cmd(self, args):
         """ We already implemented this function for Assignment 1 """
         size = self.board.size
-        str = ''
+        board = self.board.board
+        lines = []
         for row in range(size-1, -1, -1):
             start = self.board.row_start(row + 1)
-            for i in range(size):
-                #str += '.'
-                point = self.board.board[start + i]
-                if point == BLACK:
-                    str += 'X'
-                elif point == WHITE:
-                    str += 'O'
-                elif point == EMPTY:
-                    str += '.'
-                else:
-                    assert False
-            str += '\n'
-        self.respond(str)
+            lines.append("".join(BOARD_CHARS[board[start : start + size]]))
+        self.respond("\n".join(lines) + "\n")
 
     def gogui_rules_final_result_cmd(self, args):
         """ Implement this function for Assignment 1 """
@@ -322,7 +345,7 @@ class GtpConnection:
                 )
             
             #Check for a tie
-            if(len(self.board.get_empty_points()) == 0 and self.game_status == "playing"):
+            if(self.board.is_full() and self.game_status == "playing"):
                 self.game_status = "tied"
 
             # Game end conditions
@@ -377,7 +400,7 @@ class GtpConnection:
                 self.game_status = board_color
                 
             # Board is filled and no winner
-            if(len(self.board.get_empty_points()) == 0 and self.game_status == "playing"):
+            if(self.board.is_full() and self.game_status == "playing"):
                 self.game_status = "tied"
 
             # Respond to user with the move coordinate as a label
@@ -426,12 +449,8 @@ class GtpConnection:
         board_color = args[0].lower()
         color = color_to_int(board_color)
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
-        gtp_moves = []
-        for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
-        sorted_moves = " ".join(sorted(gtp_moves))
-        self.respond(sorted_moves)
+        labels = self._point_labels
+        self.respond(" ".join(sorted(labels[move].upper() for move in moves)))
 
 
 def point_to_coord(point, boardsize):
@@ -489,7 +508,9 @@ def move_to_coord(point_str, board_size):
     return row, col
 
 
+COLOR_TO_INT = {"b": BLACK, "w": WHITE, "e": EMPTY, "BORDER": BORDER}
+
+
 def color_to_int(c):
     """convert character to the appropriate integer code"""
-    color_to_int = {"b": BLACK, "w": WHITE, "e": EMPTY, "BORDER": BORDER}
-    return color_to_int[c]
+    return COLOR_TO_INT[c]
@@ -50,6 +50,39 @@ class SimpleGoBoardTestCase(unittest.TestCase):
         count = count_colors(goboard)
         self.assertEqual(count, [size * size - 1, 1, 0, 3 * (size + 1)])
 
+    def do_test_check_for_five(self, size, points):
+        goboard = GoBoard(size)
+        for point in points[:4]:
+            goboard.play_move(point, BLACK)
+            self.assertFalse(goboard.check_for_five(point, BLACK))
+        goboard.play_move(points[4], BLACK)
+        self.assertTrue(goboard.check_for_five(points[4], BLACK))
+        self.assertFalse(goboard.check_for_five(points[4], WHITE))
+
+    def test_size_7_five_horizontal(self):
+        goboard = GoBoard(7)
+        self.do_test_check_for_five(7, [goboard.pt(4, c) for c in range(3, 8)])
+
+    def test_size_7_five_vertical(self):
+        goboard = GoBoard(7)
+        self.do_test_check_for_five(7, [goboard.pt(r, 2) for r in range(1, 6)])
+
+    def test_size_7_five_diagonal(self):
+        goboard = GoBoard(7)
+        self.do_test_check_for_five(
+            7, [goboard.pt(2 + i, 3 + i) for i in range(5)])
+
+    def test_size_7_five_anti_diagonal(self):
+        goboard = GoBoard(7)
+        self.do_test_check_for_five(
+            7, [goboard.pt(7 - i, 1 + i) for i in range(5)])
+
+    def test_size_7_four_is_not_five(self):
+        goboard = GoBoard(7)
+        for c in [1, 2, 3, 4, 6]:
+            goboard.play_move(goboard.pt(1, c), BLACK)
+        self.assertFalse(goboard.check_for_five(goboard.pt(1, 6), BLACK))
+
 
 """Utility"""
 def count_colors(goboard):
@@ -0,0 +1,42 @@
+"""
+transposition_table.py
+Transposition table for caching search results by board hash.
+Boards are keyed by the Zobrist hash maintained in GoBoard.hash.
+"""
+
+"""
+Bound flags stored with each entry.
+EXACT: the value is the true minimax value of the position.
+LOWER: the search failed high, the true value is at least the value.
+UPPER: the search failed low, the true value is at most the value.
+"""
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable(object):
+    # Based on the table by Martin Mueller.
+    # Table is stored in a dictionary, with board hash as key,
+    # and a (value, depth, flag) tuple as the value
+
+    # Empty dictionary
+    def __init__(self):
+        self.table = {}
+
+    # Used to print the whole table with print(tt)
+    def __repr__(self):
+        return self.table.__repr__()
+
+    def __len__(self):
+        return len(self.table)
+
+    def store(self, code, value, depth, flag=EXACT):
+        self.table[code] = (value, depth, flag)
+
+    # Python dictionary returns 'None' if key not found by get()
+    def lookup(self, code):
+        return self.table.get(code)
+
+    def clear(self):
+        self.table.clear()
@@ -5,8 +5,8 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil
 from board import GoBoard
-from endgamesolver import GomokuSolver, TranspositionTable, ZobristHasher
-import signal
+from endgamesolver import GomokuSolver
+from transposition_table import TranspositionTable
 import numpy as np
 
 
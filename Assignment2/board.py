@@ -24,6 +24,7 @@ from board_util import (
     MAXSIZE,
     GO_POINT
 )
+from zobrist import ZobristHasher
 
 """
 The GoBoard class implements a board and basic functions to play
@@ -102,6 +103,13 @@ class GoBoard(object):
         assert len(self.rows) == self.size
         assert len(self.cols) == self.size
         assert len(self.diags) == (2 * (self.size - 5) + 1) * 2
+        # All windows of five consecutive points scored by the heuristic,
+        # one window per row, for gathering colors in a single indexing
+        self.windows = np.array(
+            [line[i:i + 5]
+             for line in self.rows + self.cols + self.diags
+             for i in range(len(line) - 4)],
+            dtype=np.intp).reshape(-1, 5)
 
     def reset(self, size):
         """
@@ -118,6 +126,13 @@ class GoBoard(object):
         self.board = np.full(self.maxpoint, BORDER, dtype=GO_POINT)
         self._initialize_empty_points(self.board)
         self.calculate_rows_cols_diags()
+        # One bitboard per color, indexed by color: an int with bit p set
+        # iff point p holds a stone of that color
+        self.bitboards = [0, 0, 0]
+        # Zobrist hash of the stones on the board, updated incrementally
+        # in play_move and undo_move
+        self.hasher = ZobristHasher(size)
+        self.hashCode = self.hasher.hash(self)
 
     def copy(self):
         b = GoBoard(self.size)
@@ -129,6 +144,9 @@ class GoBoard(object):
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        b.bitboards = list(self.bitboards)
+        b.hasher = self.hasher
+        b.hashCode = self.hashCode
         return b
 
     def get_color(self, point):
@@ -256,6 +274,11 @@ class GoBoard(object):
         opp_block = self._block_of(nb_point)
         if not self._has_liberty(opp_block):
             captures = list(where1d(opp_block))
+            opp_color = self.get_color(nb_point)
+            for stone in captures:
+                self.hashCode = self.hasher.update(
+                    self.hashCode, stone, opp_color, EMPTY)
+                self.bitboards[opp_color] &= ~(1 << int(stone))
             self.board[captures] = EMPTY
             if len(captures) == 1:
                 single_capture = nb_point
@@ -278,6 +301,8 @@ class GoBoard(object):
             return False
        
         self.board[point] = color
+        self.bitboards[color] |= 1 << int(point)
+        self.hashCode = self.hasher.update(self.hashCode, point, EMPTY, color)
         self.current_player = GoBoardUtil.opponent(color)
         self.last2_move = self.last_move
         self.last_move = point
@@ -320,19 +345,45 @@ class GoBoard(object):
         """
         Returns BLACK or WHITE if any five in a row is detected for the color
         EMPTY otherwise.
+        Uses the bitboards: BORDER bits are never set, so runs cannot
+        wrap around rows, and each direction is checked for all points
+        at once.
+        """
+        for color in (BLACK, WHITE):
+            x = self.bitboards[color]
+            for stride in (1, self.NS, self.NS + 1, self.NS - 1):
+                # Bit p survives iff p, p + stride, ..., p + 4 * stride match
+                y = x & (x >> stride)
+                y &= y >> (2 * stride)
+                if y & (x >> (4 * stride)):
+                    return color
+        return EMPTY
+
+    def detect_five_through(self, point):
         """
-        for r in self.rows:
-            result = self.has_five_in_list(r)
-            if result != EMPTY:
-                return result
-        for c in self.cols:
-            result = self.has_five_in_list(c)
-            if result != EMPTY:
-                return result
-        for d in self.diags:
-            result = self.has_five_in_list(d)
-            if result != EMPTY:
-                return result
+        Returns the color of point if it is part of a five in a row,
+        EMPTY otherwise.
+        Only the four lines through point are scanned, which is enough
+        to detect any five created by the last move played on point.
+        """
+        if point == PASS:
+            return EMPTY
+        board = self.board
+        color = board[point]
+        if not is_black_white(color):
+            return EMPTY
+        for stride in (1, self.NS, self.NS + 1, self.NS - 1):
+            count = 1
+            p = point + stride
+            while board[p] == color:
+                count += 1
+                p += stride
+            p = point - stride
+            while board[p] == color:
+                count += 1
+                p -= stride
+            if count >= 5:
+                return color
         return EMPTY
 
     def has_five_in_list(self, list):
@@ -353,5 +404,8 @@ class GoBoard(object):
         return EMPTY
 
     def undo_move(self, move):
+        color = self.board[move]
+        self.hashCode = self.hasher.update(self.hashCode, move, color, EMPTY)
+        self.bitboards[color] &= ~(1 << int(move))
         self.board[move] = EMPTY
         self.current_player = GoBoardUtil.opponent(self.current_player)
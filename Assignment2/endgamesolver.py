@@ -1,247 +1,274 @@
-import signal
-from board_util import GoBoardUtil
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY
 from board import GoBoard
 import numpy as np
-import random
-from sys import stdin, stdout, stderr
+import multiprocessing
+from time import monotonic
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
 
 
-class ZobristHasher:
-
-    def __init__(self, boardSize):
-        self.zobristArray = []
-        self.boardIndices = boardSize*boardSize
-
-        for _ in range(self.boardIndices):
-            self.zobristArray.append([random.getrandbits(64) for _ in range(3)])
-
-    def hash(self, board):
-        hashCode = self.zobristArray[0][board[0]]
-        for i in range(1,self.boardIndices):
-            hashCode = hashCode ^ self.zobristArray[i][board[i]]
-        
-        return hashCode
-
-
-class TranspositionTable(object):
-# Written by Martin Mueller
-# Table is stored in a dictionary, with board code as key, 
-# and minimax score as the value
-
-    # Empty dictionary
-    def __init__(self):
-        self.table = {}
-
-    # Used to print the whole table with print(tt)
-    def __repr__(self):
-        return self.table.__repr__()
-        
-    def store(self, code, score):
-        self.table[code] = score
-    
-    # Python dictionary returns 'None' if key not found by get()
-    def lookup(self, code):
-        return self.table.get(code)
-
+"""
+Depth stored for results that do not depend on any heuristic leaf
+evaluation. Such entries are valid at every search depth.
+"""
+SOLVED_DEPTH = 127
 
 
 class GomokuSolver:
-    def __init__(self):
+    def __init__(self, workers=1):
         self.int_to_color = {1:"b", 2:"w"}
         self.infinity = 10000
-        self.weights = [0, 2, 8, 16, 64, 10000]
-        signal.signal(signal.SIGALRM, self.handler)
-        
-
-    def handler(self, signum, frame):
-        raise TimeoutError
-
-    def point_to_coord(self, point, boardsize):
-        """
-        Transform point given as board array index 
-        to (row, col) coordinate representation.
-        Special case: PASS is not transformed
-        """
-        NS = boardsize + 1
-        return divmod(point, NS)
-
-    def solve(self, board, time, tt, hasher):
-        # Set alarm
-        signal.alarm(time)
+        self.weights = np.array([0, 2, 8, 16, 64, 10000])
+        self.threatOffsets = {}
+        # Number of processes searching the root moves. With 1, the search
+        # runs in this process and keeps its transposition tables between
+        # calls to solve
+        self.workers = workers
+
+    def solve(self, board, time, tt):
+        if self.workers > 1:
+            return self.solveParallel(board, time)
+
+        # minimax raises TimeoutError once the deadline has passed
+        self.deadline = monotonic() + time
+        self.nodes = 0
         boardCopy = board.copy()
         ttBlack, ttWhite = tt
+        bestMove = None
 
         try:
-            
-            score, move = self.minimax(boardCopy, -1 * self.infinity, self.infinity, ttBlack, ttWhite, hasher) # Get the score and best move
-    
-            if(score == 0):
-                return "draw", move
-            elif(score > 0):
-
-                win = board.current_player
-                return self.int_to_color[win], move
-            else:
-                win = GoBoardUtil.opponent(board.current_player)
-                return self.int_to_color[win], None
+            # minimax only checks the lines through the last move for a
+            # five, so check the whole board once at the root
+            outcome = boardCopy.detect_five_in_a_row()
+            score, move = self.evaluate_score_endgame(boardCopy, outcome), None
+
+            # Iterative deepening. Each iteration stores its best moves in the
+            # transposition table, which orders the moves of the next one.
+            # Stop as soon as the result does not depend on heuristic leaves.
+            maxDepth = 0 if outcome else max(1, boardCopy.get_empty_points().size)
+            for depth in range(1, maxDepth + 1):
+                self.heuristicLeaves = 0
+                score, move = self.minimax(boardCopy, -1 * self.infinity, self.infinity, ttBlack, ttWhite, depth) # Get the score and best move
+                bestMove = move
+                if self.heuristicLeaves == 0 or abs(score) == self.infinity:
+                    break
+
+            return self.result(board, score, move)
 
         except TimeoutError:
+            # Best move of the last completed iteration, if any
+            return "unknown", bestMove
+
+    def solveParallel(self, board, time):
+        """
+        Root-parallel search: the root moves are dealt out to self.workers
+        processes, each searching its share for time seconds with its own
+        transposition tables. The best of their scores decides the result.
+        """
+        outcome = board.detect_five_in_a_row()
+        moves = board.get_empty_points()
+        if outcome or moves.size == 0:
+            return self.result(board, self.evaluate_score_endgame(board, outcome), None)
+
+        workers = min(self.workers, moves.size)
+        shares = [(board, moves[i::workers], time) for i in range(workers)]
+        scores = {}
+        proven = True
+        with multiprocessing.Pool(workers) as pool:
+            for shareScores, shareProven in pool.imap_unordered(searchRootMoves, shares):
+                scores.update(shareScores)
+                proven = proven and shareProven
+                # A won move decides the result, stop the other workers
+                if self.infinity in shareScores.values():
+                    break
+        if not scores:
             return "unknown", None
 
-        finally:
-            signal.alarm(0)
+        move = max(scores, key=scores.get)
+        if scores[move] == self.infinity or (proven and len(scores) == moves.size):
+            return self.result(board, scores[move], move)
+        return "unknown", move
+
+    def result(self, board, score, move):
+        """
+        Result of solve for a proven score of board with best move move.
+        """
+        if(score == 0):
+            return "draw", move
+        elif(score > 0):
+
+            win = board.current_player
+            return self.int_to_color[win], move
+        else:
+            win = GoBoardUtil.opponent(board.current_player)
+            return self.int_to_color[win], None
+
+    def storeResult(self, result, tt, hashCode, flag=EXACT, depth=SOLVED_DEPTH):
+        score, move = result
+        tt.store(hashCode, score, move, flag, depth)
 
-    def storeResult(self, result, tt, hashCode):
-        tt.store(hashCode, result)
 
+    def minimax(self, board, alpha, beta, ttBlack, ttWhite, depth):
 
-    def minimax(self, board, alpha, beta, ttBlack, ttWhite, hasher):
+        # Check the clock every 64 nodes
+        self.nodes += 1
+        if not self.nodes & 0x3F and monotonic() > self.deadline:
+            raise TimeoutError
 
         if(board.current_player == 1):
             tt = ttBlack
         else:
             tt = ttWhite
 
-        size  = len(board.board)
-        board1d = []
-
-        for i in range(size):
-            if board.board[i] != 3:
-                board1d.append(board.board[i])
-    
-        hashCode = hasher.hash(board1d)
-   
+        hashCode = board.hashCode
+        alphaOrig = alpha
+        leavesBefore = self.heuristicLeaves
 
+        # Stored scores are exact or bounds, depending on the window
+        # they were searched with. Entries searched less deep than depth
+        # only contribute their best move to the move ordering.
+        ttMove = None
         result = tt.lookup(hashCode)
-
         if result:
-            return result
+            score, ttMove, flag, ttDepth = result
+            if ttDepth >= depth:
+                if ttDepth < SOLVED_DEPTH:
+                    self.heuristicLeaves += 1
+                if flag == EXACT:
+                    return score, ttMove
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, ttMove
         
-        outcome =  board.detect_five_in_a_row()
+        # Only the last move can have completed a five: solve() checks
+        # the whole board once before searching
+        outcome =  board.detect_five_through(board.last_move)
+        moves = board.get_empty_points()
 
         # Check if terminal board
-        if (board.get_empty_points().size == 0 or outcome):
+        if (moves.size == 0 or outcome):
             result = self.evaluate_score_endgame(board, outcome), None
             self.storeResult(result, tt, hashCode)
             return result
-            
 
-        # Order moves by heuristic
-        moves = board.get_empty_points()
         self.board = board
 
-        #TODO: Right now timeouts while calculating best move using Heuristic
-        moves = sorted(moves, key = self.evaluate_move_heuristic, reverse = True)
-        
+        # Depth limit reached: estimate the value with the heuristic
+        if depth == 0:
+            self.heuristicLeaves += 1
+            score = self.evaluate_state_heuristic()
+            score = max(-self.infinity + 1, min(self.infinity - 1, score))
+            return score, None
+
+        color = board.current_player
+        play_move = board.play_move
+        undo_move = board.undo_move
+        check_double_threat = self.check_double_threat
+        evaluate_state_heuristic = self.evaluate_state_heuristic
+        minimax = self.minimax
+
+        # Play each move once to both score it for move ordering
+        # and check whether it makes a double threat
+        scores = []
+        threats = []
+        for i, m in enumerate(moves):
+            play_move(m, color)
+            if(check_double_threat(board, m)):
+                threats.append(i)
+            scores.append(-evaluate_state_heuristic())
+            undo_move(m)
+
+        # Order moves by heuristic
+        order = sorted(range(len(moves)), key = scores.__getitem__, reverse = True)
+
+        # A double threat wins: pick the first one in move order
+        if threats:
+            i = min(threats, key = lambda i: (-scores[i], i))
+            result = self.infinity, moves[i]
+            self.storeResult(result, tt, hashCode)
+            return result
+
+        moves = [moves[i] for i in order]
+
+        # Try the best move of the previous iteration first
+        if ttMove is not None and ttMove in moves:
+            moves.remove(ttMove)
+            moves.insert(0, ttMove)
 
         #Choose best move
         best = moves[0]
 
-        for m in moves:
-
-            board.play_move(m, board.current_player)
-            if(self.check_double_threat(board, m)):
-                result = self.infinity, m
-                board.undo_move(m)
-                self.storeResult(result, tt, hashCode)
-                return result
+        # Principal variation search: the first move gets the full window,
+        # the others only have to be proven no better than alpha with a
+        # zero window, and are searched again if that fails
+        for i, m in enumerate(moves):
+            play_move(m, color)
+            if i == 0:
+                value, _ = minimax(board, -beta, -alpha, ttBlack, ttWhite, depth - 1)
+                value = -value
             else:
-                board.undo_move(m)
-            
-
-        for m in moves:
-            board.play_move(m, board.current_player)
-            value, _ = self.minimax(board, -beta, -alpha, ttBlack, ttWhite, hasher)
-            value = -value
+                value, _ = minimax(board, -alpha - 1, -alpha, ttBlack, ttWhite, depth - 1)
+                value = -value
+                if alpha < value < beta:
+                    value, _ = minimax(board, -beta, -alpha, ttBlack, ttWhite, depth - 1)
+                    value = -value
             if value > alpha:
                 alpha = value
                 best = m
-            board.undo_move(m)
+            undo_move(m)
             if value >= beta: 
                 result = beta, m
-                self.storeResult(result, tt, hashCode) 
+                self.storeResult(result, tt, hashCode, LOWER,
+                                 self.resultDepth(depth, leavesBefore))
                 return result
             
 
         result = alpha, best
-        self.storeResult(result, tt, hashCode)
+        if alpha <= alphaOrig:
+            flag = UPPER
+        else:
+            flag = EXACT
+        self.storeResult(result, tt, hashCode, flag,
+                         self.resultDepth(depth, leavesBefore))
         return result
 
-    def check_double_threat(self, board, m):
-        mr, mc= self.point_to_coord(m, board.size)
-        mr = mr -1
-        mc = mc -1
-        board2d = GoBoardUtil.get_twoD_board(board)
-        thrtCnt = 0
-
-
-        try:
-            if(mr + 4 < board.size and board2d[mr + 1, mc] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr+2, mc] and board2d[mr+3, mc] == 0  and board2d[mr+4, mc] == 0):
-                #stdout.write("yo\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-        try:
-            if(mr - 4 >= 0 and board2d[mr - 1, mc] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr-2, mc] and board2d[mr-3, mc] == 0  and board2d[mr-4, mc] == 0):
-               # stdout.write("yo2\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
-
-            if(mc + 4 < board.size and board2d[mr , mc + 1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr, mc+2] and board2d[mr, mc+3] == 0 and board2d[mr, mc+4] == 0):
-                #stdout.write("yo3\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
-
-            if(mc - 4 >= 0 and board2d[mr, mc-1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr, mc-2] and board2d[mr, mc-3] == 0 and board2d[mr, mc-4] == 0):
-                #stdout.write("yo4\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
-
-            if(mc - 4 >= 0 and mr - 4 >= 0 and board2d[mr -1, mc-1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr -2, mc-2] and board2d[mr-3, mc-3] == 0 and board2d[mr-4, mc-4] == 0):
-                #stdout.write("yo5\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
-
-            if(mr + 4 < board.size and mc + 4 < board.size and board2d[mr+1, mc+1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr+2, mc+2] and board2d[mr+3, mc+3] == 0 and board2d[mr+4, mc+4] == 0):
-                #stdout.write("yo6\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
-
-            if(mr + 4 < board.size and mc - 4 >= 0  and board2d[mr+1, mc-1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr+2, mc-2] and board2d[mr+3, mc-3] == 0) and board2d[mr+4, mc-4] == 0:
-                #stdout.write("yo7\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-
-        try:
+    def resultDepth(self, depth, leavesBefore):
+        """
+        Depth to store for a result searched to depth: SOLVED_DEPTH
+        unless a heuristic leaf was evaluated since leavesBefore.
+        """
+        if self.heuristicLeaves == leavesBefore:
+            return SOLVED_DEPTH
+        return depth
 
-            if(mc + 4 < board.size and mr - 4 >= 0 and board2d[mr-1, mc+1] == board2d[mr, mc] and board2d[mr, mc] == board2d[mr-2, mc+2] and board2d[mr-3, mc+3] == 0 and board2d[mr-4, mc+4] == 0):
-                #stdout.write("yo8\n")
-                thrtCnt+=1
-        except IndexError:
-            pass
-        
-        #stdout.write(str(thrtCnt) + "\n")
-        if(thrtCnt >=2):
-            #stdout.write(str(mr) + "\n" +str(mc) +"\n")
-            return True
-        else:
-            return False
+    def check_double_threat(self, board, m):
+        """
+        Check whether the stone just played on m makes two threats:
+        in at least two of the eight directions, the next two points
+        have the same color as m and the two points after them are empty.
+        Steps off the board land on BORDER, which fails the pattern.
+        """
+        points = np.clip(m + self.threat_offsets(board.NS), 0, board.maxpoint - 1)
+        colors = board.board[points]
+        color = board.board[m]
+        threats = ((colors[0] == color) & (colors[1] == color)
+                   & (colors[2] == EMPTY) & (colors[3] == EMPTY))
+        return np.count_nonzero(threats) >= 2
+
+    def threat_offsets(self, NS):
+        """
+        Offsets of the points 1 to 4 steps away in each of the eight
+        directions on a board with row stride NS, as a (4, 8) array.
+        Cached per board size.
+        """
+        offsets = self.threatOffsets.get(NS)
+        if offsets is None:
+            directions = np.array([NS, -NS, 1, -1, -NS - 1, NS + 1, NS - 1, -NS + 1])
+            offsets = np.arange(1, 5)[:, None] * directions[None, :]
+            self.threatOffsets[NS] = offsets
+        return offsets
 
     def evaluate_score_endgame(self, board, outcome):
         if(outcome):
@@ -256,43 +283,70 @@ class GomokuSolver:
         return score
     
     def evaluate_state_heuristic(self):
-        outcome = self.board.detect_five_in_a_row()
+        # Called right after a move, or on a non-terminal node
+        outcome = self.board.detect_five_through(self.board.last_move)
         if(outcome != 0):
             return -10000
    
-        score = 0
-        lines = self.board.rows + self.board.cols + self.board.diags
-
-        for line in lines:
-            for i in range(len(line) - 5):
-                line_score = 0
-                myCount, oppCount = self.count_stones(line[i:i+5])
-                line_score = self.weights[myCount] - self.weights[oppCount]
-                if myCount >= 1 and oppCount >= 1:
-                    line_score = 0
-                score += line_score
-
-        return score
+        myCount, oppCount = self.count_stones(self.board.board[self.board.windows])
+        scores = self.weights[myCount] - self.weights[oppCount]
+        # Windows containing stones of both colors are dead
+        scores[(myCount >= 1) & (oppCount >= 1)] = 0
+        return int(scores.sum())
             
 
-    def count_stones(self, line):
-
-        countBlack = 0
-        countWhite = 0
-
-        for stone in line:
-            stoneColor = self.board.board[stone]
-
-            if stoneColor == 1:
-                countBlack += 1
-            elif stoneColor == 2:
-                countWhite += 1
+    def count_stones(self, windows):
+        """
+        Count the stones of the player to move and of the opponent
+        in each row of windows, an array of point colors.
+        Returns two integer arrays with one count per window.
+        """
+        countBlack = np.count_nonzero(windows == BLACK, axis=-1)
+        countWhite = np.count_nonzero(windows == WHITE, axis=-1)
 
-        if(self.board.current_player == 1):
+        if(self.board.current_player == BLACK):
             myCount = countBlack
             oppCount = countWhite
         else:
             myCount = countWhite
             oppCount = countBlack
 
-        return myCount, oppCount
\ No newline at end of file
+        return myCount, oppCount
+
+
+def searchRootMoves(share):
+    """
+    Search the root moves of a board by iterative deepening. Runs in a
+    worker process of GomokuSolver.solveParallel.
+    share is a tuple (board, moves, time): moves are the root moves to
+    search, for at most time seconds.
+    Returns a dict of the scores of moves, from the last completed
+    iteration, and whether these scores are proven.
+    """
+    board, moves, time = share
+    solver = GomokuSolver()
+    solver.deadline = monotonic() + time
+    solver.nodes = 0
+    ttBlack, ttWhite = TranspositionTable(), TranspositionTable()
+    infinity = solver.infinity
+    color = board.current_player
+    scores = {}
+    proven = False
+
+    try:
+        for depth in range(1, board.get_empty_points().size + 1):
+            solver.heuristicLeaves = 0
+            iteration = {}
+            for m in moves:
+                board.play_move(m, color)
+                value, _ = solver.minimax(board, -infinity, infinity, ttBlack, ttWhite, depth - 1)
+                board.undo_move(m)
+                iteration[int(m)] = -value
+            scores = iteration
+            proven = solver.heuristicLeaves == 0
+            if proven or infinity in iteration.values():
+                break
+    except TimeoutError:
+        pass
+
+    return scores, proven
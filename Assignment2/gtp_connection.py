@@ -21,7 +21,8 @@ from board_util import (
 import numpy as np
 import re
 import time
-from endgamesolver import GomokuSolver, TranspositionTable, ZobristHasher
+from endgamesolver import GomokuSolver
+from transposition_table import TranspositionTable
 
 TIME_LIMIT = 1  #Default time is set to 1 second
 
@@ -44,7 +45,6 @@ class GtpConnection:
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
-        self.hasher = ZobristHasher(self.board.size)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -67,6 +67,7 @@ class GtpConnection:
             "gogui-rules_final_result": self.gogui_rules_final_result_cmd,
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "timelimit": self.time_limit_cmd,
+            "workers": self.workers_cmd,
             "solve": self.solve_cmd 
         }
 
@@ -80,6 +81,7 @@ class GtpConnection:
             "genmove": (1, "Usage: genmove {w,b}"),
             "play": (2, "Usage: play {b,w} MOVE"),
             "legal_moves": (1, "Usage: legal_moves {w,b}"),
+            "workers": (1, "Usage: workers INT"),
         }
 
     def write(self, data):
@@ -160,7 +162,6 @@ class GtpConnection:
         Reset the board to empty board of given size
         """
         self.board.reset(size)
-        self.hasher = ZobristHasher(size)
         self.ttBlack = TranspositionTable()
         self.ttWhite = TranspositionTable()
         self.tt = [self.ttBlack, self.ttWhite]
@@ -274,9 +275,10 @@ class GtpConnection:
         
         # Check for winner
      
-        result, move = self.Solver.solve(self.board, TIME_LIMIT, self.tt, self.hasher)    # Minimax(board, depth, player)
+        result, move = self.Solver.solve(self.board, TIME_LIMIT, self.tt)    # Minimax(board, depth, player)
         # Not solved within time limit or we're losing, play random
-        if result == "unknown":
+        # unless the search completed at least one iteration
+        if result == "unknown" and move is None:
             move = self.go_engine.get_move(self.board, color)
 
         move_coord = point_to_coord(move, self.board.size)
@@ -288,6 +290,22 @@ class GtpConnection:
 
     """ Start of Assignment 2 Code inside Class """
 
+    def workers_cmd(self, args):
+        """
+        Set the number of processes the solver searches the root moves with,
+        1 (the default) for the sequential search
+        """
+        try:
+            workers = int(args[0])
+        except ValueError:
+            self.respond("Number of workers must be an integer")
+            return
+        if workers < 1:
+            self.respond("Number of workers must be at least 1")
+            return
+        self.Solver.workers = workers
+        self.respond("")
+
     def time_limit_cmd(self, args):
         global TIME_LIMIT   #Global for genmove_cmd or solve_cmd to access
         try:
@@ -303,9 +321,9 @@ class GtpConnection:
 
     def solve_cmd(self, args):
         # TODO: Hashing and Transposition Table
-        result, move = self.Solver.solve(self.board, TIME_LIMIT, self.tt, self.hasher)
+        result, move = self.Solver.solve(self.board, TIME_LIMIT, self.tt)
 
-        if(move):
+        if(move and result != "unknown"):
             move = format_point(point_to_coord(move, self.board.size))
             self.respond(result + " " + move)
         else:
@@ -0,0 +1,61 @@
+"""
+transposition_table.py
+Transposition table for caching search results by board hash.
+Boards are keyed by the Zobrist hash maintained in GoBoard.hashCode.
+"""
+
+import numpy as np
+
+"""
+Bound flags of transposition table entries.
+EXACT: the score is the minimax value of the position.
+LOWER: the search failed high, the minimax value is at least the score.
+UPPER: the search failed low, the minimax value is at most the score.
+Flag 0 marks an unused slot.
+"""
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+TT_ENTRY = np.dtype([
+    ("key", "u8"),
+    ("score", "i4"),
+    ("depth", "i1"),
+    ("flag", "i1"),
+    ("move", "i2"),
+])
+
+
+class TranspositionTable(object):
+# Based on the table by Martin Mueller
+# Fixed-size table of packed entries in a numpy array, indexed by the
+# low bits of the board code. A slot is replaced unless it holds a
+# different position searched to a greater depth.
+
+    # size must be a power of two
+    def __init__(self, size=1 << 20):
+        assert size & (size - 1) == 0
+        self.mask = size - 1
+        self.table = np.zeros(size, dtype=TT_ENTRY)
+
+    # Used to print the used entries of the table with print(tt)
+    def __repr__(self):
+        return self.table[self.table["flag"] != 0].__repr__()
+
+    def store(self, code, score, move, flag=EXACT, depth=0):
+        entry = self.table[code & self.mask]
+        if entry["flag"] and entry["key"] != code and entry["depth"] > depth:
+            return
+        if move is None:
+            move = -1
+        self.table[code & self.mask] = (code, score, depth, flag, move)
+
+    # Returns (score, move, flag, depth), or None if code is not in the table
+    def lookup(self, code):
+        entry = self.table[code & self.mask]
+        if not entry["flag"] or entry["key"] != code:
+            return None
+        move = int(entry["move"])
+        if move < 0:
+            move = None
+        return int(entry["score"]), move, int(entry["flag"]), int(entry["depth"])
@@ -0,0 +1,42 @@
+"""
+zobrist.py
+Zobrist hashing of Go board positions.
+"""
+
+import numpy as np
+
+
+class ZobristHasher:
+    """
+    One random 64-bit key per (point, color) for every point of the
+    padded board array, with colors EMPTY, BLACK, WHITE.
+    The hash of a position is the XOR of the keys of all its points,
+    so playing or undoing a move updates it with two XORs.
+    """
+
+    def __init__(self, boardSize):
+        self.boardIndices = boardSize * boardSize + 3 * (boardSize + 1)
+        # Fixed seed, so the same position hashes the same in every process
+        self.zobristArray = np.random.default_rng(0xC0FFEE).integers(
+            0, 1 << 64, size=(self.boardIndices, 3), dtype=np.uint64)
+        # Python int copy of the keys for the scalar XORs in update()
+        self.keys = self.zobristArray.tolist()
+        # The non-BORDER points, row by row
+        NS = boardSize + 1
+        self.points = (np.arange(1, boardSize + 1)[:, None] * NS + 1
+                       + np.arange(boardSize)).ravel()
+
+    def hash(self, board):
+        """
+        Full hash of board, XORing the keys of all non-BORDER points.
+        Only needed once per position; afterwards use update().
+        """
+        colors = board.board[self.points]
+        return int(np.bitwise_xor.reduce(self.zobristArray[self.points, colors]))
+
+    def update(self, hashCode, point, old_color, new_color):
+        """
+        Hash after the color of point changes from old_color to new_color.
+        """
+        keys = self.keys[point]
+        return hashCode ^ keys[old_color] ^ keys[new_color]
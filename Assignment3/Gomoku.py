@@ -3,7 +3,7 @@
 # Set the path to your python3 above
 
 from gtp_connection import GtpConnection
-from board_util import GoBoardUtil
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY
 from board import GoBoard
 
 class Gomoku3(object):
@@ -11,7 +11,6 @@ The board uses a 1-dimensional representation with padding
 
 import numpy as np
 from board_util import (
-    GoBoardUtil,
     BLACK,
     WHITE,
     EMPTY,
@@ -25,6 +24,19 @@ from board_util import (
     GO_POINT
 )
 
+"""
+Sum of the two colors: the opponent of color is _OPP_SUM - color
+"""
+_OPP_SUM = BLACK + WHITE
+
+"""
+Shifts of the line masks in detect_five_in_a_row, as uint64 so that
+numpy does not need to convert them on every call
+"""
+SHIFT_1 = np.uint64(1)
+SHIFT_2 = np.uint64(2)
+SHIFT_4 = np.uint64(4)
+
 """
 The GoBoard class implements a board and basic functions to play
 moves, check the end of the game, and count the acore at the end.
@@ -35,16 +47,32 @@ The board is stored as a one-dimensional array of GO_POINT in self.board.
 See GoBoardUtil.coord_to_point for explanations of the array encoding.
 """
 class GoBoard(object):
+    # Tables built by calculate_rows_cols_diags, by board size.
+    # They only depend on the size and are never modified, so all
+    # boards of the same size share them
+    _lines_cache = {}
+
     def __init__(self, size):
         """
         Creates a Go board of given size
         """
         assert 2 <= size <= MAXSIZE
         self.reset(size)
-        self.calculate_rows_cols_diags()
 
     def calculate_rows_cols_diags(self):
+        cached = self._lines_cache.get(self.size)
+        if cached is not None:
+            (self.rows, self.cols, self.diags, self.lines, self.point_lines,
+             self.point_bits) = cached
+            return
+        # For each point, the lines through it, as pairs
+        # (index of the line in self.lines, bit of the point in the line)
+        self.point_lines = [[] for _ in range(self.maxpoint)]
+        # The same pairs with the bits as Python ints, for code that works
+        # on Python int copies of the line masks
+        self.point_bits = [[] for _ in range(self.maxpoint)]
         if self.size < 5:
+            self.lines = np.zeros((0, self.size), dtype=np.intp)
             return
         # precalculate all rows, cols, and diags for 5-in-a-row detection
         self.rows = []
@@ -63,45 +91,50 @@ class GoBoard(object):
             self.cols.append(current_col)
         
         self.diags = []
+        size = self.size
+        # Diagonals are computed from their start point and length, so
+        # the board does not need to be empty when this runs
+        def diag_SE(row, col):
+            length = min(size - row, size - col) + 1
+            return [self.pt(row + k, col + k) for k in range(length)]
+        def diag_NE(row, col):
+            length = min(row, size - col + 1)
+            return [self.pt(row - k, col + k) for k in range(length)]
         # diag towards SE, starting from first row (1,1) moving right to (1,n)
-        start = self.row_start(1)
-        for i in range(start, start + self.size):
-            diag_SE = []
-            pt = i
-            while self.get_color(pt) == EMPTY:
-                diag_SE.append(pt)
-                pt += self.NS + 1
-            if len(diag_SE) >= 5:
-                self.diags.append(diag_SE)
+        for col in range(1, size + 1):
+            diag = diag_SE(1, col)
+            if len(diag) >= 5:
+                self.diags.append(diag)
         # diag towards SE and NE, starting from (2,1) downwards to (n,1)
-        for i in range(start + self.NS, self.row_start(self.size) + 1, self.NS):
-            diag_SE = []
-            diag_NE = []
-            pt = i
-            while self.get_color(pt) == EMPTY:
-                diag_SE.append(pt)
-                pt += self.NS + 1
-            pt = i
-            while self.get_color(pt) == EMPTY:
-                diag_NE.append(pt)
-                pt += -1 * self.NS + 1
-            if len(diag_SE) >= 5:
-                self.diags.append(diag_SE)
-            if len(diag_NE) >= 5:
-                self.diags.append(diag_NE)
+        for row in range(2, size + 1):
+            diag = diag_SE(row, 1)
+            if len(diag) >= 5:
+                self.diags.append(diag)
+            diag = diag_NE(row, 1)
+            if len(diag) >= 5:
+                self.diags.append(diag)
         # diag towards NE, starting from (n,2) moving right to (n,n)
-        start = self.row_start(self.size) + 1
-        for i in range(start, start + self.size):
-            diag_NE = []
-            pt = i
-            while self.get_color(pt) == EMPTY:
-                diag_NE.append(pt)
-                pt += -1 * self.NS + 1
-            if len(diag_NE) >=5:
-                self.diags.append(diag_NE)
+        for col in range(2, size + 1):
+            diag = diag_NE(size, col)
+            if len(diag) >= 5:
+                self.diags.append(diag)
         assert len(self.rows) == self.size
         assert len(self.cols) == self.size
         assert len(self.diags) == (2 * (self.size - 5) + 1) * 2
+        # All lines as one array of points, one line per row, padded at
+        # the end with point 0, which is always BORDER. Used to gather
+        # the colors of all lines in a single indexing
+        lines = self.rows + self.cols + self.diags
+        self.lines = np.array(
+            [line + [0] * (self.size - len(line)) for line in lines],
+            dtype=np.intp)
+        for i, line in enumerate(lines):
+            for j, pt in enumerate(line):
+                self.point_lines[pt].append((i, np.uint64(1 << j)))
+                self.point_bits[pt].append((i, 1 << j))
+        self._lines_cache[self.size] = (
+            self.rows, self.cols, self.diags, self.lines, self.point_lines,
+            self.point_bits)
 
     def reset(self, size):
         """
@@ -115,22 +148,52 @@ class GoBoard(object):
         self.last2_move = None
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
+        # Offsets of the four neighbors
+        self.nbr_offsets = (-1, 1, -self.NS, self.NS)
         self.board = np.full(self.maxpoint, BORDER, dtype=GO_POINT)
+        # Set of the empty points, kept in sync with self.board
+        self._empty = set()
         self._initialize_empty_points(self.board)
+        # Marker board reused by every connected_component call
+        self.marker = np.zeros(self.maxpoint, dtype=bool)
+        self._initialize_zobrist()
+        self._initialize_neighbor_tables()
         self.calculate_rows_cols_diags()
+        # Occupancy of each line by color, a (3, lines) array indexed by
+        # color: bit j of line_masks[color, i] is set iff point j of
+        # line i has color
+        self.line_masks = np.zeros((3, len(self.lines)), dtype=np.uint64)
 
     def copy(self):
-        b = GoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.last_move = self.last_move
-        b.last2_move = self.last2_move
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
+        """
+        Return an independent copy of the board.
+        Bypasses reset(): scalar attributes and the line tables are
+        shared, only the board, the empty points, the marker and the
+        line masks are duplicated.
+        """
+        b = object.__new__(GoBoard)
+        b.__dict__.update(self.__dict__)
         b.board = np.copy(self.board)
+        b._empty = set(self._empty)
+        b.marker = np.zeros(self.maxpoint, dtype=bool)
+        b.line_masks = self.line_masks.copy()
         return b
 
+    def copy_from(self, other):
+        """
+        Set this board to the position of other, a board of the same size,
+        reusing this board's arrays instead of allocating new ones.
+        """
+        np.copyto(self.board, other.board)
+        np.copyto(self.line_masks, other.line_masks)
+        self._empty.clear()
+        self._empty.update(other._empty)
+        self.hash = other.hash
+        self.current_player = other.current_player
+        self.ko_recapture = other.ko_recapture
+        self.last_move = other.last_move
+        self.last2_move = other.last2_move
+
     def get_color(self, point):
         return self.board[point]
 
@@ -140,19 +203,25 @@ class GoBoard(object):
     def is_legal(self, point, color):
         """
         Check whether it is legal for color to play on point
-        This method tries to play the move on a temporary copy of the board.
-        This prevents the board from being modified by the move
+        Without captures or suicide, this is exactly the check play_move
+        makes: a pass, or a move on an empty point
         """
-        board_copy = self.copy()
-        can_play_move = board_copy.play_move(point, color)
-        return can_play_move
+        return point == PASS or self.board[point] == EMPTY
 
     def get_empty_points(self):
         """
         Return:
-            The empty points on the board
+            The empty points on the board, in increasing order
+        """
+        return np.fromiter(sorted(self._empty), dtype=np.intp,
+                           count=len(self._empty))
+
+    def empty_count(self):
+        """
+        Return:
+            The number of empty points, without building the point array
         """
-        return where1d(self.board == EMPTY)
+        return len(self._empty)
     
     def get_color_points(self, color):
         """
@@ -169,6 +238,7 @@ class GoBoard(object):
     def _initialize_empty_points(self, board):
         """
         Fills points on the board with EMPTY
+        and records them in the set of empty points
         Argument
         ---------
         board: numpy array, filled with BORDER
@@ -176,6 +246,35 @@ class GoBoard(object):
         for row in range(1, self.size + 1):
             start = self.row_start(row)
             board[start : start + self.size] = EMPTY
+            self._empty.update(range(start, start + self.size))
+
+    def _initialize_zobrist(self):
+        """
+        Create the Zobrist keys, one row per point and one column
+        per color EMPTY, BLACK, WHITE, and the hash of the empty board.
+        The keys are seeded, so equal positions hash equally across runs.
+        """
+        rng = np.random.default_rng(0x455)
+        self.zobrist = rng.integers(0, 2**63, size=(self.maxpoint, 3),
+                                    dtype=np.uint64)
+        empty_points = where1d(self.board == EMPTY)
+        self.hash = int(np.bitwise_xor.reduce(self.zobrist[empty_points, EMPTY]))
+
+    def _initialize_neighbor_tables(self):
+        """
+        Precompute the four neighbors and the four diagonal neighbors
+        of every point, as rows of two (maxpoint, 4) index arrays.
+        Indices are clipped into the board array, so that the rows of
+        BORDER points at the edges stay valid.
+        """
+        p = np.arange(self.maxpoint)
+        NS = self.NS
+        self.nbrs = np.clip(
+            np.stack([p - 1, p + 1, p - NS, p + NS], axis=1),
+            0, self.maxpoint - 1).astype(np.int32)
+        self.dnbrs = np.clip(
+            np.stack([p - NS - 1, p - NS + 1, p + NS - 1, p + NS + 1], axis=1),
+            0, self.maxpoint - 1).astype(np.int32)
 
     def is_eye(self, point, color):
         """
@@ -184,14 +283,10 @@ class GoBoard(object):
         if not self._is_surrounded(point, color):
             return False
         # Eye-like shape. Check diagonals to detect false eye
-        opp_color = GoBoardUtil.opponent(color)
-        false_count = 0
-        at_edge = 0
-        for d in self._diag_neighbors(point):
-            if self.board[d] == BORDER:
-                at_edge = 1
-            elif self.board[d] == opp_color:
-                false_count += 1
+        opp_color = _OPP_SUM - color
+        dnb_colors = self.board[self.dnbrs[point]]
+        at_edge = int(np.any(dnb_colors == BORDER))
+        false_count = int(np.count_nonzero(dnb_colors == opp_color))
         return false_count <= 1 - at_edge  # 0 at edge, 1 in center
 
     def _is_surrounded(self, point, color):
@@ -199,22 +294,19 @@ class GoBoard(object):
         check whether empty point is surrounded by stones of color
         (or BORDER) neighbors
         """
-        for nb in self._neighbors(point):
-            nb_color = self.board[nb]
-            if nb_color != BORDER and nb_color != color:
-                return False
-        return True
+        nb_colors = self.board[self.nbrs[point]]
+        return not np.any((nb_colors != BORDER) & (nb_colors != color))
 
     def _has_liberty(self, block):
         """
         Check if the given block has any liberty.
-        block is a numpy boolean array
+        block is a numpy boolean array, or an array of the points
+        of the block
+        All neighbors of the block are checked in one gather
         """
-        for stone in where1d(block):
-            empty_nbs = self.neighbors_of_color(stone, EMPTY)
-            if empty_nbs:
-                return True
-        return False
+        if block.dtype == bool:
+            block = where1d(block)
+        return bool(np.any(self.board[self.nbrs[block]] == EMPTY))
 
     def _block_of(self, stone):
         """
@@ -222,28 +314,64 @@ class GoBoard(object):
         Returns a board of boolean markers which are set for
         all the points in the block 
         """
-        color = self.get_color(stone)
+        color = self.board[stone]
         assert is_black_white(color)
         return self.connected_component(stone)
 
     def connected_component(self, point):
         """
         Find the connected component of the given point.
+        Returns self.marker, which is overwritten by the next call:
+        copy it to keep the result.
         """
-        marker = np.full(self.maxpoint, False, dtype=bool)
-        pointstack = [point]
-        color = self.get_color(point)
+        marker = self.marker
+        marker.fill(False)
+        board = self.board
+        color = board[point]
         assert is_black_white_empty(color)
+        offsets = self.nbr_offsets
+        # Depth-first search with the neighbor arithmetic inlined,
+        # instead of building a neighbor list for every point popped
+        pointstack = [point]
         marker[point] = True
         while pointstack:
             p = pointstack.pop()
-            neighbors = self.neighbors_of_color(p, color)
-            for nb in neighbors:
-                if not marker[nb]:
+            for d in offsets:
+                nb = p + d
+                if board[nb] == color and not marker[nb]:
                     marker[nb] = True
                     pointstack.append(nb)
         return marker
 
+    def _flood_fill(self, point):
+        """
+        Find the block of the stone on point. Liberties are detected
+        during the same pass, so no marker board or second scan over
+        the block is needed.
+        Returns (list of the stones of the block,
+                 boolean: whether the block has an EMPTY neighbor)
+        """
+        board = self.board
+        offsets = self.nbr_offsets
+        color = board[point]
+        stones = [point]
+        seen = {point}
+        has_liberty = False
+        i = 0
+        while i < len(stones):
+            p = stones[i]
+            i += 1
+            for d in offsets:
+                nb = p + d
+                nb_color = board[nb]
+                if nb_color == color:
+                    if nb not in seen:
+                        seen.add(nb)
+                        stones.append(nb)
+                elif nb_color == EMPTY:
+                    has_liberty = True
+        return stones, has_liberty
+
     def _detect_and_process_capture(self, nb_point):
         """
         Check whether opponent block on nb_point is captured.
@@ -253,10 +381,18 @@ class GoBoard(object):
         This result is used in play_move to check for possible ko
         """
         single_capture = None
-        opp_block = self._block_of(nb_point)
-        if not self._has_liberty(opp_block):
-            captures = list(where1d(opp_block))
+        opp_color = self.board[nb_point]
+        assert is_black_white(opp_color)
+        captures, has_liberty = self._flood_fill(nb_point)
+        if not has_liberty:
+            masks = self.line_masks[opp_color]
+            for stone in captures:
+                for line, bit in self.point_lines[stone]:
+                    masks[line] &= ~bit
+            self.hash ^= int(np.bitwise_xor.reduce(
+                self.zobrist[captures, opp_color] ^ self.zobrist[captures, EMPTY]))
             self.board[captures] = EMPTY
+            self._empty.update(captures)
             if len(captures) == 1:
                 single_capture = nb_point
         return single_capture
@@ -270,99 +406,102 @@ class GoBoard(object):
         # Special cases
         if point == PASS:
             self.ko_recapture = None
-            self.current_player = GoBoardUtil.opponent(color)
+            self.current_player = _OPP_SUM - color
             self.last2_move = self.last_move
             self.last_move = point
             return True
         elif self.board[point] != EMPTY:
             return False
-        
+        self.play_stone(point, color)
+        return True
+
+    def play_stone(self, point, color):
+        """
+        Play a stone of color on point, which must be EMPTY
+        Fast path of play_move without its checks, for callers such as
+        playouts that only play stones on empty points
+        """
         self.board[point] = color
-        self.current_player = GoBoardUtil.opponent(color)
+        self._empty.discard(point)
+        self.hash ^= int(self.zobrist[point, EMPTY] ^ self.zobrist[point, color])
+        masks = self.line_masks[color]
+        for line, bit in self.point_lines[point]:
+            masks[line] |= bit
+        self.current_player = _OPP_SUM - color
         self.last2_move = self.last_move
         self.last_move = point
-        return True
 
     def neighbors_of_color(self, point, color):
         """ List of neighbors of point of given color """
-        nbc = []
-        for nb in self._neighbors(point):
-            if self.get_color(nb) == color:
-                nbc.append(nb)
-        return nbc
+        board = self.board
+        return [point + d for d in self.nbr_offsets if board[point + d] == color]
 
     def _neighbors(self, point):
-        """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        """ Array of all four neighbors of the point """
+        return self.nbrs[point]
 
     def _diag_neighbors(self, point):
-        """ List of all four diagonal neighbors of point """
-        return [
-            point - self.NS - 1,
-            point - self.NS + 1,
-            point + self.NS - 1,
-            point + self.NS + 1,
-        ]
+        """ Array of all four diagonal neighbors of point """
+        return self.dnbrs[point]
 
     def last_board_moves(self):
         """
-        Get the list of last_move and second last move.
+        Get the tuple of last_move and second last move.
         Only include moves on the board (not None, not PASS).
         """
-        board_moves = []
-        if self.last_move != None and self.last_move != PASS:
-            board_moves.append(self.last_move)
-        if self.last2_move != None and self.last2_move != PASS:
-            board_moves.append(self.last2_move)
-            return 
+        # PASS is None, so one test per move covers both
+        last, last2 = self.last_move, self.last2_move
+        if last is None:
+            return () if last2 is None else (last2,)
+        if last2 is None:
+            return (last,)
+        return (last, last2)
 
-    def detect_five_in_a_row(self):
+    def detect_five_in_a_row(self, point=None):
         """
         Returns BLACK or WHITE if any five in a row is detected for the color
         EMPTY otherwise.
-        """
-        for r in self.rows:
-            result = self.has_five_in_list(r)
-            if result != EMPTY:
-                return result
-        for c in self.cols:
-            result = self.has_five_in_list(c)
-            if result != EMPTY:
-                return result
-        for d in self.diags:
-            result = self.has_five_in_list(d)
-            if result != EMPTY:
-                return result
-        return EMPTY
-
-    def has_five_in_list(self, list):
-        """
-        Returns BLACK or WHITE if any five in a rows exist in the list.
-        EMPTY otherwise.
-        """
-        prev = BORDER
-        counter = 1
-        for stone in list:
-            if self.get_color(stone) == prev:
-                counter += 1
-            else:
-                counter = 1
-                prev = self.get_color(stone)
-            if counter == 5 and prev != EMPTY:
-                return prev
-        return EMPTY
-    
+        If point is given, only the lines through point are checked,
+        which is enough right after a move was played on point.
+        Uses the line masks: bit j of a mask survives the shifts and ANDs
+        iff points j to j + 4 of its line all have the color.
+        """
+        if point is not None:
+            color = self.board[point]
+            if not is_black_white(color):
+                return EMPTY
+            masks = self.line_masks[color]
+            for line, _ in self.point_lines[point]:
+                x = int(masks[line])
+                if x & (x >> 1) & (x >> 2) & (x >> 3) & (x >> 4):
+                    return color
+            return EMPTY
+        # All lines of both colors at once
+        x = self.line_masks[BLACK:]
+        five = x & (x >> SHIFT_1)
+        five &= five >> SHIFT_2
+        five &= x >> SHIFT_4
+        if not five.any():
+            return EMPTY
+        return BLACK if five[0].any() else WHITE
+
     """ Assignment 3 Code starts here """
 
     def undo_move(self, move):
         """ Revert a coloured point back to empty point """
+        color = self.board[move]
+        self.hash ^= int(self.zobrist[move, color] ^ self.zobrist[move, EMPTY])
+        masks = self.line_masks[color]
+        for line, bit in self.point_lines[move]:
+            masks[line] &= ~bit
         self.board[move] = EMPTY
+        self._empty.add(move)
 
     ####################################################################################################
     def check_block_win(self, color):
         """ Check if opponent can win directly, and play move to block it"""
         numBlocks = 0
-        opp_color = GoBoardUtil.opponent(color)
+        opp_color = _OPP_SUM - color
         points = self.get_color_points(opp_color)
         for point in points:
             if self.locate_block_win(point):
@@ -387,17 +526,19 @@ class GoBoard(object):
 
     def BW_detect_four_in_a_row(self, point, direction):
         """ Shift in positive and negative direction to detect direct wins """
+        board = self.board
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         count = 1
         empty_count = 0
 
         while (True):
             p = p + d   # Shift in positive direction 
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 count += 1
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 empty_count += 1
                 if empty_count > 1:
                     break
@@ -410,15 +551,16 @@ class GoBoard(object):
 
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         count = 1
         empty_count = 0
 
         while (True):
             p = p - d   # Shift in negative direction
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 count += 1
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 empty_count += 1
                 if empty_count > 1: #Only checking for direct wins -> OO.OO
                     break
@@ -458,19 +600,21 @@ class GoBoard(object):
 
     def detect_open_four(self, point, direction):
         """ Shift in positive and negative direction to detect direct wins """
+        board = self.board
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         l_empty_count = 0
         left = 1
 
         while (True):
             p = p + d   # Shift in positive direction 
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 left += 1
                 if left > 4:    #Checking if it is open four ..OOOO..
                     break
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 l_empty_count = 1
                 break
             else:
@@ -478,17 +622,18 @@ class GoBoard(object):
 
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         r_empty_count = 0
         right = 1
 
         while (True):
             p = p - d   # Shift in negative direction
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 right += 1
                 if right > 4:   #Checking if it is open four ..OOOO..
                     break
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 r_empty_count = 1
                 break
             else:
@@ -505,7 +650,7 @@ class GoBoard(object):
     def check_block_open_four(self, color):
             """ Check if opponent can get a open four, and play a move to prevent it"""
             numOpens = 0
-            opp_color = GoBoardUtil.opponent(color)
+            opp_color = _OPP_SUM - color
             points = self.get_color_points(opp_color)
             for point in points:
                 if self.locate_block_open_four(point):
@@ -530,9 +675,10 @@ class GoBoard(object):
 
     def detect_open_four_opp(self, point, direction):
         """ Shift in positive and negative direction to detect open four for opponent """
+        board = self.board
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         l_empty_count = 0
         left = 1
         countl = 0
@@ -542,17 +688,18 @@ class GoBoard(object):
             countl += 1
             if(countl == 6):
                 break
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 left += 1
 
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 l_empty_count += 1
             else:
                 break
 
         p = point
         d = direction
-        color = self.board[point]
+        color = board[point]
         r_empty_count = 0
         right = 1
 
@@ -561,9 +708,10 @@ class GoBoard(object):
             countr += 1
             if(countr == 6):
                 break
-            if self.board[p] == color:
+            stone = board[p]
+            if stone == color:
                 right += 1
-            elif self.board[p] == EMPTY:
+            elif stone == EMPTY:
                 r_empty_count += 1
             else:
                 break
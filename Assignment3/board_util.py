@@ -25,10 +25,11 @@ def is_black_white_empty(color):
 
 
 """
-A GO_POINT is a point on a Go board.
-It is encoded as a 32-bit integer, using the numpy type.
+A GO_POINT is the content of a point on a Go board.
+All colors fit in 8 bits, so it is encoded as an 8-bit integer,
+using the numpy type.
 """
-GO_POINT = np.int32
+GO_POINT = np.int8
 
 """
 Encoding of special pass move
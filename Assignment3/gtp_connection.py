@@ -6,10 +6,11 @@ Parts of this code were originally based on the gtp module
 in the Deep-Go project by Isaac Henrion and Amos Storkey 
 at the University of Edinburgh.
 """
+import os
 import traceback
+import select
 from sys import stdin, stdout, stderr
 
-from numpy.lib.function_base import copy
 from board_util import (
     GoBoardUtil,
     BLACK,
@@ -24,7 +25,36 @@ import numpy as np
 import re
 import random
 
-POLICY = "random"
+# Optional leading command id, echoed back in the response
+_DIGIT_RE = re.compile(r"^(\d+)\s*")
+
+# Buffered responses are written out once they exceed this many characters
+OUT_BUFFER_LIMIT = 4096
+
+# Bytes requested from stdin per read
+IN_CHUNK_SIZE = 65536
+
+# GTP color names
+_COLOR_MAP = {"b": BLACK, "w": WHITE, "e": EMPTY, "BORDER": BORDER}
+
+# Column number of each lower case column letter by its ord(), -1 if none.
+# There is no column 'i'.
+_COL_OF = [-1] * 256
+for _i, _ch in enumerate("abcdefghjklmnopqrstuvwxyz"):
+    _COL_OF[ord(_ch)] = _i + 1
+
+# Formatted point strings such as 'A1', indexed by [row, col].
+# Rows past MAXSIZE cover the padding at the end of the largest board.
+_POINT_STRINGS = np.array(
+    [[(("ABCDEFGHJKLMNOPQRSTUVWXYZ"[col - 1] + str(row)) if col else "")
+      for col in range(MAXSIZE + 1)] for row in range(MAXSIZE + 3)])
+
+# Formatted point strings for each board size, indexed by board point
+_FORMAT_POINT = {
+    size: _POINT_STRINGS[np.divmod(
+        np.arange(size * size + 3 * (size + 1)), size + 1)].tolist()
+    for size in range(2, MAXSIZE + 1)
+}
 
 
 class GtpConnection:
@@ -40,8 +70,14 @@ class GtpConnection:
             Represents the current board state.
         """
         self.numSimulations = 10    # 10 sims required by the specs
+        self.policy = "random"      # Simulation policy: random or rule_based
 
         self._debug_mode = debug_mode
+        # Responses waiting to be written to stdout, see flush
+        self._out_buf = []
+        self._out_size = 0
+        # Id of the command being executed, "" if it had none
+        self._cmd_id = ""
         self.go_engine = go_engine
         self.board = board
         self.commands = {
@@ -83,32 +119,67 @@ class GtpConnection:
         }
 
     def write(self, data):
-        stdout.write(data)
+        """ Queue data for stdout, writing it out once the buffer is full """
+        self._out_buf.append(data)
+        self._out_size += len(data)
+        if self._out_size > OUT_BUFFER_LIMIT:
+            self.flush()
 
     def flush(self):
+        """ Write all queued responses to stdout in one call """
+        if self._out_buf:
+            stdout.write("".join(self._out_buf))
+            self._out_buf = []
+            self._out_size = 0
         stdout.flush()
 
+    def input_pending(self):
+        """ Whether another command is already waiting on stdin """
+        try:
+            return bool(select.select([stdin], [], [], 0)[0])
+        except (OSError, ValueError):
+            return False
+
     def start_connection(self):
         """
         Start a GTP connection. 
         This function continuously monitors standard input for commands.
+        Input is read in large chunks and split into lines here, and
+        responses are flushed whenever the controller has no further
+        command queued, so a burst of commands costs one read and one write.
         """
-        line = stdin.readline()
-        while line:
-            self.get_cmd(line)
-            line = stdin.readline()
+        fd = stdin.fileno()
+        get_cmd = self.get_cmd
+        pending = b""
+        try:
+            chunk = os.read(fd, IN_CHUNK_SIZE)
+            while chunk:
+                lines = (pending + chunk).split(b"\n")
+                # The last piece is an incomplete line, or empty
+                pending = lines.pop()
+                for line in lines:
+                    get_cmd(line.decode(errors="replace"))
+                if not self.input_pending():
+                    self.flush()
+                chunk = os.read(fd, IN_CHUNK_SIZE)
+            if pending:
+                get_cmd(pending.decode(errors="replace"))
+        finally:
+            self.flush()
 
     def get_cmd(self, command):
         """
         Parse command string and execute it
         """
-        if len(command.strip(" \r\t")) == 0:
-            return
-        if command[0] == "#":
+        first = command[:1]
+        if first == "#":
             return
-        # Strip leading numbers from regression tests
-        if command[0].isdigit():
-            command = re.sub("^\d+", "", command).lstrip()
+        # Strip the leading command id, the response repeats it
+        self._cmd_id = ""
+        if first.isdigit():
+            match = _DIGIT_RE.match(command)
+            self._cmd_id = match.group(1)
+            command = command[match.end():]
 
         elements = command.split()
         if not elements:
@@ -117,9 +188,10 @@ class GtpConnection:
         args = elements[1:]
         if self.has_arg_error(command_name, len(args)):
             return
-        if command_name in self.commands:
+        handler = self.commands.get(command_name)
+        if handler is not None:
             try:
-                self.commands[command_name](args)
+                handler(args)
             except Exception as e:
                 self.debug_msg("Error executing command {}\n".format(str(e)))
                 self.debug_msg("Stack Trace:\n{}\n".format(
@@ -128,7 +200,6 @@ class GtpConnection:
         else:
             self.debug_msg("Unknown command: {}\n".format(command_name))
             self.error("Unknown command")
-            stdout.flush()
 
     def has_arg_error(self, cmd, argnum):
         """
@@ -148,13 +219,11 @@ class GtpConnection:
 
     def error(self, error_msg):
         """ Send error msg to stdout """
-        stdout.write("? {}\n\n".format(error_msg))
-        stdout.flush()
+        self.write("?{} {}\n\n".format(self._cmd_id, error_msg))
 
     def respond(self, response=""):
         """ Send response to stdout """
-        stdout.write("= {}\n\n".format(response))
-        stdout.flush()
+        self.write("={} {}\n\n".format(self._cmd_id, response))
 
     def reset(self, size):
         """
@@ -172,6 +241,7 @@ class GtpConnection:
     def quit_cmd(self, args):
         """ Quit game and exit the GTP interface """
         self.respond()
+        self.flush()
         exit()
 
     def name_cmd(self, args):
@@ -191,9 +261,8 @@ class GtpConnection:
         """
         Reset the game with new boardsize args[0]
         """
-        # global POLICY
         self.reset(int(args[0]))
-        # POLICY = "random"
+        # self.policy = "random"
         self.respond()
 
     def showboard_cmd(self, args):
@@ -226,11 +295,7 @@ class GtpConnection:
         board_color = args[0].lower()
         color = color_to_int(board_color)
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
-        gtp_moves = []
-        for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
-        sorted_moves = " ".join(sorted(gtp_moves))
+        sorted_moves = " ".join(format_points(moves, self.board.size))
         self.respond(sorted_moves)
 
     def play_cmd(self, args):
@@ -278,29 +343,53 @@ class GtpConnection:
         if result == GoBoardUtil.opponent(self.board.current_player):
             self.respond("resign")
             return
-        if self.board.get_empty_points().size == 0:
+        moves = self.board.get_empty_points()
+        if moves.size == 0:
             self.respond("pass")
             return
 
-        moves = self.board.get_empty_points()
-        if (POLICY == "random"):
+        policy = self.policy
+        if (policy == "random"):
             best_move = None
             best_ratio = 0
+            # One scratch board for all simulations, each candidate move is
+            # played and undone on it
+            sim_board = self.board.copy()
+            # Num of simulations required for each move (Required: 10)
+            n = self.numSimulations
+            sim = random_sim
+            opp = GoBoardUtil.opponent(color)
+            # Random order, so that a good move to cut against turns up early
+            np.random.shuffle(moves)
 
             for move in moves:
                 win = 0  # Default value before simulating each move
-                if best_move == None:
+                if best_move is None:
                     best_move = move
-                # Num of simulations required for each move (Required: 10)
-                for i in range(self.numSimulations):
-                    if random_sim(self.board.copy(), color, color):
-                        win += 1
+                # Wins this move needs to beat the best ratio so far
+                needed = best_ratio * n
+                sim_board.play_stone(move, color)
+                if needed == 0:
+                    # Nothing to cut against, run all simulations at once
+                    win = int(simulate_batch(sim_board, n, opp)[color])
+                else:
+                    for i in range(n):
+                        if sim(sim_board, color, opp):
+                            win += 1
+                        # Stop once the remaining simulations cannot catch up
+                        elif win + (n - i - 1) <= needed:
+                            break
+                sim_board.undo_move(move)
                 # Update after each move if it better than prev. move
-                if (win/10) > best_ratio:
+                ratio = win / n
+                if ratio > best_ratio:
                     best_move = move
-                    best_ratio = (win/10)
+                    best_ratio = ratio
+                    # Nothing beats winning every simulation
+                    if win == n:
+                        break
 
-        elif (POLICY == "rule_based"):
+        elif (policy == "rule_based"):
             # TO-DO
 
             best_move = self.rules_sim(self.board, color)
@@ -309,8 +398,7 @@ class GtpConnection:
             self.respond("pass")
             return
         #move = self.go_engine.get_move(self.board, color)
-        move_coord = point_to_coord(best_move, self.board.size)
-        move_as_string = format_point(move_coord)
+        move_as_string = _FORMAT_POINT[self.board.size][best_move]
         if self.board.is_legal(best_move, color):
             self.board.play_move(best_move, color)
             self.respond(move_as_string.upper())
@@ -321,58 +409,30 @@ class GtpConnection:
         if args[0] != "random" and args[0] != "rule_based":
             self.respond("Unknown Policy")
         else:
-            global POLICY
-            POLICY = args[0]
-            self.respond("Policy set to " + POLICY)
+            self.policy = args[0]
+            self.respond("Policy set to " + self.policy)
 
     def policy_moves_cmd(self, args):
         """ Assignment 3 Code inside Class ends here """
 
-        #print(POLICY)
+        policy = self.policy
         color = self.board.current_player
         outputString = ""
         moves = self.board.get_empty_points()
         moveStringList = []
-        scoreDict = {5: [], 4:[], 3:[], 2:[], 1:[]}
         labelList = ["Random", "BlockOpenFour", "OpenFour", "BlockWin" , "Win"]
         varout = 0
 
-        if (POLICY == "random"):
-            outputString += "Random"
-            for move in moves:
-                move_coord = point_to_coord(move, self.board.size)
-                move_as_string = format_point(move_coord)
-                moveStringList.append(move_as_string)
-            
-            moveStringList.sort()
-
-            for m in moveStringList:
-                outputString += " " + m
-
-        elif (POLICY == "rule_based"):
-            for move in moves:
-                move_coord = point_to_coord(move, self.board.size)
-                move_as_string = format_point(move_coord)
-                score = self.checkMove(self.board, move, color)
-                scoreDict[score].append(move_as_string.upper())
-
-            if(len(scoreDict[5]) >0):
-                varout = 5
-            elif(len(scoreDict[4]) >0):
-                varout = 4
-            elif(len(scoreDict[3]) >0):
-                varout = 3
-            elif(len(scoreDict[2]) >0):
-                varout = 2
-            elif(len(scoreDict[1]) >0):
-                varout = 1
+        if (policy == "random"):
+            moveStringList = format_points(moves, self.board.size)
+            outputString = " ".join(["Random"] + moveStringList)
 
-            
-            if(varout != 0):
-                scoreDict[varout].sort()
-                outputString = labelList[varout - 1]
-                for m in scoreDict[varout]:
-                    outputString += " " + m
+        elif (policy == "rule_based" and moves.size > 0):
+            scores = self.rule_scores(self.board, moves, color)
+            varout = int(scores.max())
+            outputString = " ".join(
+                [labelList[varout - 1]] +
+                format_points(moves[scores == varout], self.board.size))
 
 
         if(len(moveStringList) == 0 and varout == 0):
@@ -390,14 +450,8 @@ class GtpConnection:
             self.respond("")
             return
         empty = self.board.get_empty_points()
-        output = []
-        for move in empty:
-            move_coord = point_to_coord(move, self.board.size)
-            output.append(format_point(move_coord))
-        output.sort()
-        output_str = ""
-        for i in output:
-            output_str = output_str + i + " "
+        output_str = "".join(
+            m + " " for m in format_points(empty, self.board.size))
         self.respond(output_str.lower())
         return
 
@@ -425,7 +479,7 @@ class GtpConnection:
         self.respond(str)
 
     def gogui_rules_final_result_cmd(self, args):
-        if self.board.get_empty_points().size == 0:
+        if self.board.empty_count() == 0:
             self.respond("draw")
             return
         result = self.board.detect_five_in_a_row()
@@ -446,47 +500,58 @@ class GtpConnection:
                      )
 
     def rules_sim(self, board, cur_color):
-        emptyPoints = board.get_empty_points()
-
-        if (emptyPoints.size == 0):
+        if (board.empty_count() == 0):
             return None
 
         MoveWins = []
 
         bestRuleMoves = self.best_rule_moves(board, cur_color)
+        # Scratch board shared by all simulations
+        scratch = board.copy()
 
         for move, moveScore in bestRuleMoves:
-            winSimulation = self.simulate_move(board, move, cur_color)
+            winSimulation = self.simulate_move(board, move, cur_color, scratch)
             MoveWins.append(winSimulation)
 
         return bestRuleMoves[np.argmax(MoveWins)][0]
 
 
-    def simulate_move(self, board, move, color):
+    def simulate_move(self, board, move, color, scratch=None):
+        """
+        Number of rule based simulations color wins after playing move.
+        The simulations run on scratch, a board of the same size that is
+        reset to board before each of them.
+        """
         totalWins = 0
+        if scratch is None:
+            scratch = board.copy()
 
         for i in range(self.numSimulations):
-            currentBoard = board.copy()
+            currentBoard = scratch
+            currentBoard.copy_from(board)
 
             currentBoard.play_move(move, color)
-            opp = GoBoardUtil.opponent(color)
+            if currentBoard.detect_five_in_a_row(move) == color:
+                totalWins += 1
+                continue
 
             winner = EMPTY
             numPasses = 0
 
-            while currentBoard.get_empty_points().size != 0:
+            while currentBoard.empty_count() != 0:
                 currColor = currentBoard.current_player
                 bestMoves = self.best_rule_moves(currentBoard, currColor)
 
-                move, moveScore = random.choice(bestMoves)
+                simMove, moveScore = random.choice(bestMoves)
+
+                # If color didnt win then play random move
+                currentBoard.play_move(simMove, currColor)
 
                 if moveScore == 5:
                     winner = currColor
+                    break
 
-                # If color didnt win then play random move
-                currentBoard.play_move(move, currColor)
-
-                if move == PASS:
+                if simMove == PASS:
                     numPasses += 1
                 else:
                     numPasses = 0
@@ -498,32 +563,41 @@ class GtpConnection:
             if winner == color:
                 totalWins += 1
 
-            return totalWins
+        return totalWins
 
 
     def best_rule_moves(self, board, color):
+        """
+        All empty points with the highest checkMove score for color,
+        as (move, score) pairs
+        """
+        moves = board.get_empty_points()
+        if moves.size == 0:
+            return []
+        scores = self.rule_scores(board, moves, color)
+        bestScore = int(scores.max())
+
+        return [(int(moves[i]), bestScore)
+                for i in np.flatnonzero(scores == bestScore)]
+
+    def rule_scores(self, board, moves, color):
+        """ checkMove scores of the array of moves for color, as int8 """
+        counts = self.rule_counts(board, color)
+        checkMove = self.checkMove
+        return np.fromiter(
+            (checkMove(board, move, color, counts) for move in moves),
+            dtype=np.int8, count=len(moves))
+
+    def rule_counts(self, board, color):
+        """
+        Pattern counts of the position before color moves, used by
+        checkMove to score every candidate move against the same baseline
+        """
+        return (board.check_block_win(color),
+                board.check_open_four(color),
+                board.check_block_open_four(color))
 
-        moveScores = []
-
-        for move in board.get_empty_points():
-            # TODO: Make checkMove and uncomment next line
-            moveScore = self.checkMove(board, move, color)
-
-            moveScores.append((move, moveScore))
-        # Sorts in descending order according moveScore
-        moveScores.sort(reverse=True, key=lambda x: x[1])
-
-        bestMoveSet = []
-        bestScore = 0
-
-        for move in moveScores:
-            if move[1] > bestScore:
-                bestScore = move[1]
-                bestMoveSet.append(move)
-
-        return bestMoveSet
-
-    def checkMove(self, board, move, color):
+    def checkMove(self, board, move, color, counts=None):
             """
             Score Values
                 5 - WIN
@@ -531,6 +605,7 @@ class GtpConnection:
                 3 - OPENFOUR
                 2 - BLOCKOPEN4
                 1 - RANDOM
+            counts is rule_counts(board, color), computed here if not given
             """
 
             WIN = 5
@@ -539,16 +614,16 @@ class GtpConnection:
             BLOCKOPEN4 = 2
             RANDOM = 1
 
-            numBlocks = board.check_block_win(color)
-            numOpenWins = board.check_open_four(color)
-            numOpenBlocks = board.check_block_open_four(color)
+            if counts is None:
+                counts = self.rule_counts(board, color)
+            numBlocks, numOpenWins, numOpenBlocks = counts
 
-            # Play the move
-            board.play_move(move, color)
+            # Play the move, an empty point
+            board.play_stone(move, color)
 
             maxScore = RANDOM
 
-            if(board.detect_five_in_a_row() ==  color):
+            if(board.detect_five_in_a_row(move) ==  color):
                 maxScore = WIN
 
             elif(board.check_block_win(color) < numBlocks):
@@ -594,6 +669,23 @@ def format_point(move):
     return column_letters[col - 1] + str(row)
 
 
+def point_to_coord_array(points, boardsize):
+    """
+    Transform an array of points given as board array indices
+    to arrays of rows and columns. PASS is not handled.
+    """
+    return np.divmod(np.asarray(points, dtype=np.intp), boardsize + 1)
+
+
+def format_points(points, boardsize):
+    """
+    Return the points given as board array indices as a sorted list
+    of strings such as 'A1'. PASS is not handled.
+    """
+    rows, cols = point_to_coord_array(points, boardsize)
+    return np.sort(_POINT_STRINGS[rows, cols]).tolist()
+
+
 def move_to_coord(point_str, board_size):
     """
     Convert a string point_str representing a point, as specified by GTP,
@@ -606,12 +698,9 @@ def move_to_coord(point_str, board_size):
     if s == "pass":
         return PASS
     try:
-        col_c = s[0]
-        if (not "a" <= col_c <= "z") or col_c == "i":
+        col = _COL_OF[ord(s[0])]
+        if col < 0:
             raise ValueError
-        col = ord(col_c) - ord("a")
-        if col_c < "i":
-            col += 1
         row = int(s[1:])
         if row < 1:
             raise ValueError
@@ -624,35 +713,63 @@ def move_to_coord(point_str, board_size):
 
 def color_to_int(c):
     """convert character to the appropriate integer code"""
-    color_to_int = {"b": BLACK, "w": WHITE, "e": EMPTY, "BORDER": BORDER}
-
     try:
-        return color_to_int[c]
+        return _COLOR_MAP[c]
     except:
         raise KeyError("\"{}\" wrong color".format(c))
 
 
 def random_sim(board, org_color, cur_color):
-    # Check the base cases
-    result = board.detect_five_in_a_row()
-    # Winner occured
-    if result == org_color:
-        return True
-
-    # Get list of playable points
-    moves = board.get_empty_points().size
-    if moves != 0:
-        move = random.choice(board.get_empty_points())
-    else:
-        # Draw occured
-        return False
-
-    # Play a move
-    board.play_move(move, cur_color)
-    check = random_sim(board.copy(), org_color,
-                       GoBoardUtil.opponent(cur_color))
-    board.undo_move(move)
-
-    return check
+    """
+    Play random moves, cur_color first, until someone has five in a row
+    or the board is full. The board itself is not changed.
+    Returns whether org_color won.
+    """
+    return simulate_batch(board, 1, cur_color)[org_color] == 1
 
 
+def simulate_batch(board, n, cur_color):
+    """
+    Run n random_sim playouts from board, cur_color first. The five in a
+    row check, the empty points and the line masks of board are computed
+    once and shared by all of them.
+    Returns an int32 array of the winner counts, indexed by EMPTY (draw),
+    BLACK and WHITE.
+    """
+    counts = [0, 0, 0]
+    # Check the base case
+    winner = board.detect_five_in_a_row()
+    if winner != EMPTY:
+        counts[winner] = n
+        return np.array(counts, dtype=np.int32)
+
+    moves = board.get_empty_points()
+    black = board.line_masks[BLACK].tolist()
+    white = board.line_masks[WHITE].tolist()
+    point_bits = board.point_bits
+    for _ in range(n):
+        # One random order of the playable points serves the whole
+        # playout, only this playout fills them
+        np.random.shuffle(moves)
+        masks = [None, black[:], white[:]]
+        counts[_rollout(masks, point_bits, moves.tolist(), cur_color)] += 1
+    return np.array(counts, dtype=np.int32)
+
+
+def _rollout(masks, point_bits, moves, color):
+    """
+    Play moves in order, alternating colors starting with color, on masks,
+    Python int copies of a board's line masks indexed by color, and stop
+    at the first five in a row. masks is changed. point_bits is that of
+    the board.
+    Returns the winner, EMPTY if the moves run out first.
+    """
+    for move in moves:
+        lines = masks[color]
+        for line, bit in point_bits[move]:
+            x = lines[line] | bit
+            lines[line] = x
+            if x & (x >> 1) & (x >> 2) & (x >> 3) & (x >> 4):
+                return color
+        color = BLACK + WHITE - color
+    return EMPTY
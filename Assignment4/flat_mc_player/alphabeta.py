@@ -15,65 +15,90 @@ def game_end(board):
         return 0
     return None
 
-def alphabeta(board,alpha,beta):
-    #print(GoBoardUtil.get_twoD_board(board),alpha,beta)
-    result=game_end(board)
-    if (result!=None):
-        return result
+def ordered_moves(board,killer):
+    """
+    Moves to search at a node: the first solve point if there is one,
+    otherwise all legal moves with the killer move of this ply tried first
+    """
     solvePoint=board.list_solve_point()
     if solvePoint:
-        #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
-        if(result>alpha):
-            alpha=result
-        undo(board,solvePoint[0])
-        if(result>=beta):
-            return beta
-    else:
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            if(result>alpha):
-                alpha=result
-            undo(board,m)
-            if(result>=beta):
-                return beta
-    return alpha
+        return [solvePoint[0]]
+    moves=GoBoardUtil.generate_legal_moves_gomoku(board)
+    if killer is not None and board.board[killer]==EMPTY:
+        moves.remove(killer)
+        moves.insert(0,killer)
+    return moves
+
+def alphabeta(board,alpha,beta,killers=None):
+    """
+    Negamax alpha-beta search, run on an explicit stack of
+    [alpha, beta, move iterator, move being searched] frames instead of
+    recursion. killers holds the last move that caused a cutoff at each
+    ply and is tried first at that ply.
+    """
+    game_end_=game_end
+    result=game_end_(board)
+    if (result!=None):
+        return result
+    if killers is None:
+        killers=[None]*(len(board.get_empty_points())+1)
+    play=board.play_move_gomoku
+    undo_=undo
+    stack=[[alpha,beta,iter(ordered_moves(board,killers[0])),None]]
+    value=None
+    while stack:
+        frame=stack[-1]
+        if value is not None:
+            # The child searched for frame[3] returned value
+            m=frame[3]
+            undo_(board,m)
+            result=-value
+            value=None
+            if(result>frame[0]):
+                frame[0]=result
+            if(result>=frame[1]):
+                killers[len(stack)-1]=m
+                stack.pop()
+                value=frame[1]
+                continue
+        m=next(frame[2],None)
+        if m is None:
+            stack.pop()
+            value=frame[0]
+            continue
+        frame[3]=m
+        play(m,board.current_player)
+        result=game_end_(board)
+        if (result!=None):
+            value=result
+            continue
+        stack.append([-frame[1],-frame[0],
+                      iter(ordered_moves(board,killers[len(stack)])),None])
+    return value
 
 #@profile
 """
-if have winning move, return _,winning_move
-else return have_draw,"NoMove"
+if have winning move, return True,winning_move,None
+else return have_draw,"NoMove",drawing_move
 """
 def solve(board):
     result=game_end(board)
     if (result!=None):
-        return result,"First"
+        return result,"First",None
     alpha,beta=-1,1
     haveDraw=False
-    solvePoint=board.list_solve_point()
-    if solvePoint:
-        #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
-        undo(board,solvePoint[0])
+    drawMove=None
+    killers=[None]*(len(board.get_empty_points())+1)
+    for m in ordered_moves(board,None):
+        board.play_move_gomoku(m,board.current_player)
+        result=-alphabeta(board,-beta,-alpha,killers)
+        undo(board,m)
         if(result==1):
-            return True,solvePoint[0]
-        elif(result==0):
+            return True,m,None
+        elif(result==0 and not haveDraw):
             haveDraw=True
-    else: 
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            #print(GoBoardUtil.get_twoD_board(board))
-            #print(result)
-            undo(board,m)
-            if(result==1):
-                return True,m
-            elif(result==0):
-                haveDraw=True
-    return haveDraw,"NoMove"
+            drawMove=m
+    return haveDraw,"NoMove",drawMove
 
 
     """
@@ -3,19 +3,37 @@
 # Set the path to your python3 above
 
 from gtp_connection import GtpConnection
-from board_util import GoBoardUtil, EMPTY
+from board_util import GoBoardUtil, EMPTY, PASS
 from simple_board import SimpleGoBoard
+from rollout import simulate, simulate_batch, heuristic_winner
 
+import math
 import random
+import multiprocessing
 import numpy as np
 
+# Bound method of the shared generator, so random.seed in the playout
+# workers still applies to it
+_randrange = random.randrange
+
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undo_move_gomoku(move)
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
+def remove_empty(empties, pos_of, point):
+    """
+    Remove point from the list of empty points empties in O(1) by moving
+    the last empty point into its place. pos_of maps every point to its
+    index in empties.
+    """
+    i=pos_of[point]
+    last=empties.pop()
+    if last != point:
+        empties[i]=last
+        pos_of[last]=i
+
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
     moves = board.get_empty_points()
@@ -27,17 +45,40 @@ def game_result(board):
         return 'draw'
     return None
 
+def line_made_5(board, move, color):
+    """
+    Return color if its stone at move made five in a row, else None.
+    Only the four lines through move are checked.
+    """
+    if board.point_check_game_end_gomoku(move):
+        return color
+    return None
+
 class GomokuSimulationPlayer(object):
     """
     For each move do `n_simualtions_per_move` playouts,
     then select the one with best win-rate.
     playout could be either random or rule_based (i.e., uses pre-defined patterns) 
     """
-    def __init__(self, n_simualtions_per_move=10, playout_policy='random', board_size=7):
+    def __init__(self, n_simualtions_per_move=10, playout_policy='random', board_size=7, workers=1,
+                 exploration=math.sqrt(2), num_leaf_parallel=8, limit=None):
         assert(playout_policy in ['random', 'rule_based'])
         self.n_simualtions_per_move=n_simualtions_per_move
         self.board_size=board_size
         self.playout_policy=playout_policy
+        # Number of processes running playouts. With more than 1, each
+        # round picks one move per worker by UCB1 with virtual loss, see
+        # _select_batch, and every worker runs the playouts of its move
+        self.workers=workers
+        # UCB1 exploration constant for choosing the move to simulate next
+        self.exploration=exploration
+        # Number of random playouts run together each time a root move is
+        # chosen. Rule based playouts cost far more than the choice, so
+        # they are run one at a time
+        self.num_leaf_parallel=num_leaf_parallel
+        # Maximum number of moves of a playout, None for no limit. A
+        # playout cut by the limit is scored by heuristic_winner
+        self.limit=limit
 
         #NOTE: pattern has preference, later pattern is ignored if an earlier pattern is found
         self.pattern_list=['Win', 'BlockWin', 'OpenFour', 'BlockOpenFour', 'Random']
@@ -45,6 +86,7 @@ class GomokuSimulationPlayer(object):
         self.name="Gomoku3"
         self.version = 3.0
         self.best_move=None
+        self._child_arena=None
     
     def set_playout_policy(self, playout_policy='random'):
         assert(playout_policy in ['random', 'rule_based'])
@@ -67,13 +109,28 @@ class GomokuSimulationPlayer(object):
     
     def _do_playout(self, board, color_to_play):
         res=game_result(board)
+        if res is None and self.playout_policy=='random':
+            res=simulate(board.board, board.size, board.current_player, self.limit)
+            if res == EMPTY:
+                res='draw'
         simulation_moves=[]
+        empties=board.get_empty_points().tolist()
+        pos_of=[0]*len(board.board)
+        for i, point in enumerate(empties):
+            pos_of[point]=i
         while(res is None):
-            _ , candidate_moves = self.policy_moves(board, board.current_player)
-            playout_move=random.choice(candidate_moves)
-            play_move(board, playout_move, board.current_player)
+            color=board.current_player
+            playout_move=self._playout_move(board, color, empties)
+            play_move(board, playout_move, color)
+            remove_empty(empties, pos_of, playout_move)
             simulation_moves.append(playout_move)
-            res=game_result(board)
+            res=line_made_5(board, playout_move, color)
+            if res is None and not empties:
+                res='draw'
+            if res is None and len(simulation_moves) == self.limit:
+                res=heuristic_winner(board.board, board.size)
+                if res == EMPTY:
+                    res='draw'
         for m in simulation_moves[::-1]:
             undo(board, m)
         if res == color_to_play:
@@ -84,36 +141,159 @@ class GomokuSimulationPlayer(object):
             assert(res == GoBoardUtil.opponent(color_to_play))
             return -1.0
 
+    def _playout_move(self, board, color_to_play, empties):
+        """
+        Move chosen by the playout policy. empties holds the empty points
+        of board and is used instead of scanning the board for them.
+        """
+        if self.playout_policy=='rule_based':
+            ret=board.get_pattern_moves()
+            if ret is not None:
+                moves=ret[1]
+                return moves[_randrange(len(moves))]
+        return empties[_randrange(len(empties))]
+
+    def _do_playouts(self, board, color_to_play, k):
+        """
+        Sum of the results of k playouts from board, see _do_playout.
+        Random playouts share their setup through simulate_batch.
+        """
+        if self.playout_policy=='random' and game_result(board) is None:
+            winners=simulate_batch(board.board, board.size, board.current_player, k,
+                                   self.limit)
+            return winners.count(color_to_play) - \
+                   winners.count(GoBoardUtil.opponent(color_to_play))
+        return int(sum(self._do_playout(board, color_to_play) for _ in range(k)))
+
     def get_move(self, board, color_to_play):
         """
         The genmove function called by gtp_connection
         """
         moves=GoBoardUtil.generate_legal_moves_gomoku(board)
         toplay=board.current_player
-        best_result, best_move=-1.1, None
-        best_move=moves[0]
-        wins = np.zeros(len(moves))
-        visits = np.zeros(len(moves))
+        win_move=self._immediate_win(board, moves, toplay)
+        if win_move is not None:
+            return win_move
+        self._init_children(moves)
+        if self.workers > 1:
+            return self.get_move_parallel(board, toplay)
+        child_moves=self.child_moves.tolist()
+        stats=self.child_stats
+        k=self.num_leaf_parallel if self.playout_policy=='random' else 1
+        n=0
         while True:
-            for i, move in enumerate(moves):
-                play_move(board, move, toplay)
-                res=game_result(board)
-                if res == toplay:
-                    undo(board, move)
-                    #This move is a immediate win
-                    self.best_move=move
-                    return move
-                ret=self._do_playout(board, toplay)
-                wins[i] += ret
-                visits[i] += 1
-                win_rate = wins[i] / visits[i]
-                if win_rate > best_result:
-                    best_result=win_rate
-                    best_move=move
-                    self.best_move=best_move
-                undo(board, move)
-        assert(best_move is not None)
-        return best_move
+            i=self._select(n)
+            move=child_moves[i]
+            play_move(board, move, toplay)
+            stats[i] += (self._do_playouts(board, toplay, k), k)
+            undo(board, move)
+            n += k
+            self.best_move=self._best_child()
+
+    def _immediate_win(self, board, moves, toplay):
+        """
+        Return a move of moves that wins at once for toplay, or None
+        """
+        for move in moves:
+            play_move(board, move, toplay)
+            res=game_result(board)
+            undo(board, move)
+            if res == toplay:
+                self.best_move=move
+                return move
+        return None
+
+    def _init_children(self, moves):
+        """
+        Statistics of the moves at the root: child_moves, and child_stats
+        with one row (wins, visits) per move, wins being the sum of the
+        playout results (1 win, 0 draw, -1 loss) for the player to move.
+        Both are columns of one buffer kept across calls, which is only
+        reallocated when there are more moves than it can hold.
+        """
+        assert PASS not in moves
+        n=len(moves)
+        if self._child_arena is None or len(self._child_arena) < n:
+            self._child_arena=np.zeros((n, 3), dtype=np.int32)
+        arena=self._child_arena[:n]
+        arena[:, 0]=moves
+        arena[:, 1:]=0
+        self.child_moves=arena[:, 0]
+        self.child_stats=arena[:, 1:]
+        self.best_move=moves[0]
+
+    def _select(self, n):
+        """
+        Index of the root move to simulate next, by UCB1 over all moves at
+        once. n is the total number of playouts so far. Unvisited moves
+        come first.
+        """
+        wins, visits=self.child_stats.T
+        inv_v=1.0 / np.maximum(visits, 1)
+        score=wins * inv_v + \
+              self.exploration * np.sqrt(math.log(max(n, 1)) * inv_v)
+        return int(np.where(visits > 0, score, np.inf).argmax())
+
+    def _best_child(self):
+        """
+        The root move with the most playouts so far. UCB1 gives the most
+        playouts to the best move, and unlike the best win rate this is
+        not taken by a move that won its only few playouts.
+        """
+        return int(self.child_moves[self.child_stats[:, 1].argmax()])
+
+    def _select_batch(self, n, count, vloss):
+        """
+        Indices of count root moves to simulate together, chosen one at
+        a time by _select. Every chosen move gets a virtual loss of vloss
+        lost playouts first, so the next choices prefer other moves.
+        The caller replaces the virtual loss by the real results.
+        """
+        picks=[]
+        for _ in range(count):
+            i=self._select(n)
+            self.child_stats[i] += (-vloss, vloss)
+            n += vloss
+            picks.append(i)
+        return picks
+
+    def get_move_parallel(self, board, toplay):
+        """
+        Parallel version of get_move: in each round, self.workers moves
+        are chosen by _select_batch with virtual loss and the playouts of
+        each chosen move run in their own process.
+        Runs until interrupted like get_move, self.best_move is updated
+        after every round.
+        """
+        moves=self.child_moves.tolist()
+        k=self.num_leaf_parallel if self.playout_policy=='random' else 1
+        n=0
+        context = multiprocessing.get_context('fork')
+        with context.Pool(self.workers) as pool:
+            while True:
+                picks=self._select_batch(n, self.workers, k)
+                shares = [(self, board, moves[i], toplay, k, random.getrandbits(32))
+                          for i in picks]
+                for i, share_wins in zip(picks, pool.imap(run_playouts, shares)):
+                    # the k virtual visits stay as the real ones
+                    self.child_stats[i, 0] += share_wins + k
+                n += k * len(picks)
+                self.best_move=self._best_child()
+
+def run_playouts(share):
+    """
+    Run the playouts of one move. Runs in a worker process of
+    GomokuSimulationPlayer.get_move_parallel.
+    share is a tuple (player, board, move, toplay, k, seed).
+    Returns the sum of the results of the k playouts.
+    """
+    player, board, move, toplay, k, seed = share
+    random.seed(seed)
+    np.random.seed(seed)
+    play_move(board, move, toplay)
+    wins = player._do_playouts(board, toplay, k)
+    undo(board, move)
+    return wins
 
 def run():
     """
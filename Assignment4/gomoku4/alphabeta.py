@@ -1,9 +1,8 @@
-from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER
+from board_util import GoBoardUtil, BLACK, WHITE, BORDER
 #from profilehooks import profile
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undo_move_gomoku(move)
 
 def game_end(board):
     game_end, winner = board.check_game_end_gomoku()
@@ -15,65 +14,77 @@ def game_end(board):
         return 0
     return None
 
-def alphabeta(board,alpha,beta):
+# Flags of transposition table entries: the stored value is exact, or a
+# lower or upper bound of the value of the position
+EXACT, LOWER, UPPER = 0, 1, 2
+
+def alphabeta(board,alpha,beta,tt=None):
+    """
+    tt is a transposition table, a dict from (board.hash, player to move)
+    to (value, flag), shared by all positions of one search
+    """
     #print(GoBoardUtil.get_twoD_board(board),alpha,beta)
     result=game_end(board)
     if (result!=None):
         return result
+    if tt is None:
+        tt={}
+    key=(board.hash,board.current_player)
+    entry=tt.get(key)
+    if entry is not None:
+        value,flag=entry
+        if flag==EXACT:
+            return value
+        if flag==LOWER and value>=beta:
+            return beta
+        if flag==UPPER and value<=alpha:
+            return alpha
+    alphaOrig=alpha
     solvePoint=board.list_solve_point()
     if solvePoint:
-        #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
+        moves=[solvePoint[0]]
+    else:
+        moves=GoBoardUtil.generate_legal_moves_gomoku(board)
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        result=-alphabeta(board,-beta,-alpha,tt)
         if(result>alpha):
             alpha=result
-        undo(board,solvePoint[0])
+        undo(board,m)
         if(result>=beta):
+            tt[key]=(result,LOWER)
             return beta
-    else:
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            if(result>alpha):
-                alpha=result
-            undo(board,m)
-            if(result>=beta):
-                return beta
+    tt[key]=(alpha,EXACT if alpha>alphaOrig else UPPER)
     return alpha
 
 #@profile
 """
-if have winning move, return _,winning_move
-else return have_draw,"NoMove"
+if have winning move, return True,winning_move,None
+else return have_draw,"NoMove",drawing_move
 """
 def solve(board):
     result=game_end(board)
     if (result!=None):
-        return result,"First"
+        return result,"First",None
     alpha,beta=-1,1
     haveDraw=False
+    drawMove=None
+    tt={}
     solvePoint=board.list_solve_point()
     if solvePoint:
-        #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
-        undo(board,solvePoint[0])
+        moves=[solvePoint[0]]
+    else:
+        moves=GoBoardUtil.generate_legal_moves_gomoku(board)
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        result=-alphabeta(board,-beta,-alpha,tt)
+        undo(board,m)
         if(result==1):
-            return True,solvePoint[0]
-        elif(result==0):
+            return True,m,None
+        elif(result==0 and not haveDraw):
             haveDraw=True
-    else: 
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            #print(GoBoardUtil.get_twoD_board(board))
-            #print(result)
-            undo(board,m)
-            if(result==1):
-                return True,m
-            elif(result==0):
-                haveDraw=True
-    return haveDraw,"NoMove"
+            drawMove=m
+    return haveDraw,"NoMove",drawMove
 
 
     """
@@ -171,8 +171,8 @@ class GoBoardUtil(object):
         Rows 1..size of goboard are copied into rows 0..size - 1 of board2d
         """
         size = goboard.size
-        board2d = np.zeros((size, size), dtype = np.int32)
-        for row in range(size):
-            start = goboard.row_start(row + 1)
-            board2d[row, :] = goboard.board[start : start + size]
-        return board2d
+        NS = goboard.NS
+        # Row r takes points r * NS .. r * NS + size, the first being
+        # the BORDER column shared with the previous row
+        rows = goboard.board[NS : NS + size * NS].reshape(size, NS)
+        return rows[:, 1:].copy()
@@ -30,6 +30,8 @@ class GtpConnection():
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
+        # Copy of the board taken before a timed search, see save_board
+        self.sboard = None
         signal.signal(signal.SIGALRM, self.handler)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
@@ -56,7 +58,8 @@ class GtpConnection():
             "solve": self.solve_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "workers": self.workers_cmd
         }
         self.timelimit=2
 
@@ -70,7 +73,8 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "workers": (1, 'Usage: workers INT')
         }
     
     def set_playout_policy(self, args):
@@ -280,20 +284,54 @@ class GtpConnection():
         except Exception as e:
             self.respond('{}'.format(str(e)))
 
+    def workers_cmd(self, args):
+        """
+        Set the number of processes running playouts in genmove,
+        1 (the default) for the sequential search
+        """
+        try:
+            workers = int(args[0])
+        except ValueError:
+            self.respond("Number of workers must be an integer")
+            return
+        if workers < 1:
+            self.respond("Number of workers must be at least 1")
+            return
+        self.go_engine.workers = workers
+        self.respond('')
+
     def timelimit_cmd(self, args):
         self.timelimit = args[0]
         self.respond('')
 
+    def save_board(self):
+        """
+        Save the board before a timed search, which may be interrupted
+        while it has moves played on the board. The saved board is reused
+        while the board size stays the same.
+        """
+        if self.sboard is None or self.sboard.size != self.board.size:
+            self.sboard = self.board.copy()
+        else:
+            self.sboard.copy_from(self.board)
+
+    def restore_board(self):
+        """
+        Go back to the board saved by save_board. The searched board is
+        kept to be overwritten by the next save_board.
+        """
+        self.board, self.sboard = self.sboard, self.board
+
     def handler(self, signum, fram):
-        self.board = self.sboard
+        self.restore_board()
         raise Exception("unknown")
 
     def solve_cmd(self, args):
         try:
-            self.sboard = self.board.copy()
+            self.save_board()
             signal.alarm(int(self.timelimit)-1)
             winner,move = self.board.solve()
-            self.board = self.sboard
+            self.restore_board()
             signal.alarm(0)
             if move != "NoMove":
                 if move == None:
@@ -326,9 +364,9 @@ class GtpConnection():
         move=None
         try:
             signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
+            self.save_board()
             move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
+            self.restore_board()
             signal.alarm(0)
         except Exception as e:
             move=self.go_engine.best_move
@@ -0,0 +1,112 @@
+"""
+rollout.py
+
+Random playouts for the Gomoku4 player, run on a plain list copy of
+the board array instead of on the board object.
+"""
+
+import random
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY
+from simple_board import build_line_table
+
+def simulate(board_arr, size, current_player, limit=None):
+    """
+    Play random moves on a copy of board_arr, current_player first, until
+    one color has five in a row or the board is full.
+    Only the lines through each new stone are checked for five, so the
+    position must not have a five in a row already.
+    With a limit, a playout that is still going after limit moves is
+    scored by heuristic_winner.
+    Returns the winner, BLACK or WHITE, or EMPTY for a draw.
+    """
+    return simulate_batch(board_arr, size, current_player, 1, limit)[0]
+
+def simulate_batch(board_arr, size, current_player, k, limit=None):
+    """
+    Run k simulate playouts from the same position, sharing the list copy
+    of the board and the empty points between them.
+    Returns the list of their winners.
+    """
+    board = board_arr.tolist()
+    empties = [point for point, color in enumerate(board) if color == EMPTY]
+    playout = make_rollout(size)
+    return [playout(board[:], empties[:], current_player, limit)
+            for _ in range(k)]
+
+def heuristic_winner(board_arr, size):
+    """
+    Guess the winner of an unfinished position: the color with more
+    stones in some line of five points holding no opponent stone.
+    Returns BLACK, WHITE, or EMPTY if both colors are even.
+    """
+    lines = np.asarray(board_arr)[build_line_table(size)]
+    black = (lines == BLACK).sum(axis=1)
+    white = (lines == WHITE).sum(axis=1)
+    black_best = black[white == 0].max(initial=0)
+    white_best = white[black == 0].max(initial=0)
+    if black_best > white_best:
+        return BLACK
+    if white_best > black_best:
+        return WHITE
+    return EMPTY
+
+# Playout functions of each board size, see make_rollout
+_rollouts = {}
+
+# Source of a playout for one board size. {checks} is replaced by one
+# _CHECK_SOURCE block per direction, so the steps are constants and the
+# direction loop is unrolled. {other} is BLACK + WHITE
+_PLAYOUT_SOURCE = """
+def playout(board, empties, color, limit=None):
+    shuffle(empties)
+    if limit is not None and limit < len(empties):
+        del empties[limit:]
+        cut = True
+    else:
+        cut = False
+    for move in empties:
+        board[move] = color
+{checks}
+        color = {other} - color
+    if cut:
+        return heuristic_winner(board, {size})
+    return EMPTY
+"""
+
+# The BORDER padding ends every walk before it leaves the array
+_CHECK_SOURCE = """
+        count = 1
+        p = move + {d}
+        while board[p] == color:
+            count += 1
+            p += {d}
+        p = move - {d}
+        while board[p] == color:
+            count += 1
+            p -= {d}
+        if count >= 5:
+            return color
+"""
+
+def make_rollout(size):
+    """
+    Return the playout function for boards of the given size, generated
+    once per size with the line steps of that size written in as
+    constants.
+    playout(board, empties, color, limit=None) plays the empty points in
+    random order on the board list, color first, at most limit of them
+    if limit is given, and returns the winner, EMPTY if there is none.
+    """
+    playout = _rollouts.get(size)
+    if playout is None:
+        NS = size + 1
+        checks = "".join(_CHECK_SOURCE.format(d=d)
+                         for d in (1, NS, NS + 1, NS - 1))
+        namespace = {"shuffle": random.shuffle, "heuristic_winner": heuristic_winner,
+                     "EMPTY": EMPTY}
+        exec(_PLAYOUT_SOURCE.format(checks=checks, size=size, other=BLACK + WHITE),
+             namespace)
+        playout = namespace["playout"]
+        _rollouts[size] = playout
+    return playout
@@ -15,8 +15,42 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        MAXSIZE, NULLPOINT
 import alphabeta
 
+# POINT_BITS[point] is the bit of point in a bitboard
+POINT_BITS = [1 << point for point in range(MAXSIZE * MAXSIZE + 3 * (MAXSIZE + 1))]
+
+# Line tables of each board size, see build_line_table
+_line_tables = {}
+
+def build_line_table(size):
+    """
+    Return an int32 array with one row for every five points in a row on
+    a board of the given size, the points of the row in order.
+    Built once per size.
+    """
+    table = _line_tables.get(size)
+    if table is None:
+        NS = size + 1
+        lines = []
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                point = coord_to_point(row, col, size)
+                for d, row_step, col_step in ((1, 0, 1), (NS, 1, 0),
+                                              (NS + 1, 1, 1), (NS - 1, 1, -1)):
+                    if 1 <= row + 4 * row_step <= size and \
+                       1 <= col + 4 * col_step <= size:
+                        lines.append([point + i * d for i in range(5)])
+        table = np.array(lines, dtype=np.int32).reshape(-1, 5)
+        _line_tables[size] = table
+    return table
+
 class SimpleGoBoard(object):
 
+    __slots__ = ('size', 'NS', 'WE', 'ko_recapture', 'current_player', 'maxpoint',
+                 'board', 'liberty_of', 'neighbors', 'zobrist', 'hash', 'bitboards')
+
+    # Zobrist keys of each board size, shared by all boards of that size
+    _zobrist_cache = {}
+
     def get_color(self, point):
         return self.board[point]
 
@@ -87,6 +121,25 @@ class SimpleGoBoard(object):
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
         self._initialize_empty_points(self.board)
         self._initialize_neighbors()
+        self._initialize_zobrist()
+        # bitboards[color] has the bit of every stone of color set,
+        # indexed by color like the zobrist keys
+        self.bitboards = [0, 0, 0]
+
+    def _initialize_zobrist(self):
+        """
+        Zobrist hashing: self.zobrist[point][color] is a random 64 bit key,
+        and self.hash is the XOR of the keys of all stones on the board.
+        Moves update the hash incrementally.
+        """
+        zobrist = self._zobrist_cache.get(self.size)
+        if zobrist is None:
+            rng = np.random.default_rng(self.size)
+            zobrist = rng.integers(0, 2**63, size=(self.maxpoint, 3),
+                                   dtype=np.uint64).tolist()
+            self._zobrist_cache[self.size] = zobrist
+        self.zobrist = zobrist
+        self.hash = 0
 
     def copy(self):
         b = SimpleGoBoard(self.size)
@@ -96,8 +149,22 @@ class SimpleGoBoard(object):
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        b.hash = self.hash
+        b.bitboards = self.bitboards[:]
         return b
 
+    def copy_from(self, other):
+        """
+        Set this board to the position of other, a board of the same size,
+        reusing this board's array
+        """
+        assert self.size == other.size
+        np.copyto(self.board, other.board)
+        self.ko_recapture = other.ko_recapture
+        self.current_player = other.current_player
+        self.hash = other.hash
+        self.bitboards[:] = other.bitboards
+
     def row_start(self, row):
         assert row >= 1
         assert row <= self.size
@@ -344,12 +411,24 @@ class SimpleGoBoard(object):
             Returns boolean: whether move was legal
             """
         assert is_black_white(color)
-        assert point != PASS
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self.hash ^= self.zobrist[point][color]
+        self.bitboards[color] ^= POINT_BITS[point]
         self.current_player = GoBoardUtil.opponent(color)
         return True
+
+    def undo_move_gomoku(self, point):
+        """
+            Take back the stone on point, for the game of gomoku
+            The player of that stone is to play again
+            """
+        color = int(self.board[point])
+        self.hash ^= self.zobrist[point][color]
+        self.bitboards[color] ^= POINT_BITS[point]
+        self.board[point] = EMPTY
+        self.current_player = color
         
     def _point_direction_check_connect_gomoko(self, point, shift):
         """
@@ -368,6 +447,8 @@ class SimpleGoBoard(object):
                     break
             else:
                 break
+        if count == 5:
+            return True
         d = -d
         p = point
         while True:
@@ -407,17 +488,15 @@ class SimpleGoBoard(object):
         """
             Check if the game ends for the game of Gomoku.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
+        # Five in a row with step d: some bit b is set together with
+        # b + d, ..., b + 4 * d. The BORDER points have no bits, so a row
+        # cannot wrap around the board edge
+        NS = self.NS
+        for color in (WHITE, BLACK):
+            bits = self.bitboards[color]
+            for d in (1, NS, NS + 1, NS - 1):
+                if bits & bits >> d & bits >> 2 * d & bits >> 3 * d & bits >> 4 * d:
+                    return True, color
         return False, None
 
     def solve(self):
@@ -439,28 +518,26 @@ class SimpleGoBoard(object):
             return winner, move
 
     def check_pattern(self,point,have,direction_x,direction_y,moveSet,patternList,color,flag):
-        for i in range(0,4):
-            if have in patternList[i]:
-                for dis in patternList[i][have]:
-                    moveSet[i].add(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                #flag[0]=True
-                break
-        if (not (0<= point<len(self.board))) or len(have)==9:
-            return
-#if self.get_color(point)==BORDER or len(have)==7:
-#            return
-        piece=self.get_color(point)
-        if piece==EMPTY:
-            piece='.'
-        elif piece==color:
-            piece='x'
-        elif piece == BORDER:
-            piece='B'
-        else:
-            piece='o'
-        have+=piece
-        #print(GoBoardUtil.format_point(self._point_to_coord(point)),have,self.board[point])
-        self.check_pattern(point+direction_x+direction_y*self.NS,have,direction_x,direction_y,moveSet,patternList,color,flag)
+        """
+        Walk from point in the given direction, collecting the pieces seen
+        in have, and add the moves of every pattern of patternList that
+        have matches to moveSet. Runs as a loop, one step per point.
+        """
+        step=direction_x+direction_y*self.NS
+        board=self.board
+        size=len(board)
+        pieces={EMPTY:'.', color:'x', BORDER:'B', GoBoardUtil.opponent(color):'o'}
+        while True:
+            for i in range(0,4):
+                if have in patternList[i]:
+                    for dis in patternList[i][have]:
+                        moveSet[i].add(point-step*(dis+1))
+                    #flag[0]=True
+                    break
+            if (not (0<= point<size)) or len(have)==9:
+                return
+            have+=pieces[board[point]]
+            point+=step
 
     def get_pattern_moves(self):
         """
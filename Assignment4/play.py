@@ -1,4 +1,6 @@
+import os
 import pexpect
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 player1='flat_mc_player/Gomoku3.py'
 player2='random_player/Gomoku2.py'
@@ -78,31 +80,41 @@ def playSingleGame(alternative=False):
             assert(status=='unknown')
     return result,numTimeout
 
+def playGame(i, numGame):
+    """
+    Play game i of numGame, player1 is black in the first half of the
+    games. Runs in a worker process of playGames.
+    Returns (alternative, result, numTimeout).
+    """
+    alter = i >= numGame/2
+    result,timeout=playSingleGame(alternative=alter)
+    return alter,result,timeout
+
 def playGames(numGame=10):
     global win1,win2,draw,numTimeout
     print("player1:",player1)
     print("player2:",player2)
-    for i in range(0,numGame):
-        print("Game: ",i+1)
-        if(i<numGame/2):
-            alter=False
-        else:
-            alter=True
-        result,timeout=playSingleGame(alternative=alter)
-        if timeout>0:
-            numTimeout+=1
-        else:
-            if result==0:
-                print("draw")
-                draw+=1
+    # The games are independent, so they run in parallel processes and
+    # only their results are tallied here
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures={executor.submit(playGame,i,numGame):i for i in range(0,numGame)}
+        for future in as_completed(futures):
+            print("Game: ",futures[future]+1)
+            alter,result,timeout=future.result()
+            if timeout>0:
+                numTimeout+=1
             else:
-                if result==1 and alter==False or result==2 and alter==True:
-                    print("player1 wins")
-                    win1+=1
+                if result==0:
+                    print("draw")
+                    draw+=1
                 else:
-                    assert(result==1 and alter==True or result==2 and alter==False)
-                    win2+=1
-                    print("player2 wins")
+                    if result==1 and alter==False or result==2 and alter==True:
+                        print("player1 wins")
+                        win1+=1
+                    else:
+                        assert(result==1 and alter==True or result==2 and alter==False)
+                        win2+=1
+                        print("player2 wins")
 
 def outputResult():
     print('player1 win',win1,'player2 win',win2,'draw',draw)
@@ -116,8 +128,9 @@ def saveResult():
     f.write("draw {}\n".format(draw))
     f.close()
 
-playGames()
-outputResult()
-saveResult()
+if __name__=='__main__':
+    playGames()
+    outputResult()
+    saveResult()
 
 